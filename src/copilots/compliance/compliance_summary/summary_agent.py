@@ -1,85 +1,258 @@
 # src/copilots/compliance/compliance_summary/summary_agent.py
-import json
-from datetime import datetime
-from typing import Dict, Any, List
+import functools
+import re
+import sys
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from types import MappingProxyType
+from typing import Dict, Any, List, ClassVar, FrozenSet, Mapping, Optional, Tuple
 import logging
 
-# Import handlers
+# Import handlers (Kafka and database helpers are imported lazily, see below)
 try:
-    from ..shared.kafka_handler import KafkaHandler
-    from ..shared.models import get_database_session, test_database_connection
-    from ..config import Config
+    from ..config import get_config
 except ImportError:
-    import sys
     import os
     current_dir = os.path.dirname(os.path.abspath(__file__))
     parent_dir = os.path.dirname(os.path.dirname(os.path.dirname(current_dir)))
     sys.path.insert(0, parent_dir)
-    from copilots.compliance.shared.kafka_handler import KafkaHandler
-    from copilots.compliance.shared.models import get_database_session, test_database_connection
-    from copilots.compliance.config import Config
+    from copilots.compliance.config import get_config
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Issue phrases that mark a validation failure as critical
+CRITICAL_ISSUE_KEYWORDS = ("number not found", "not detected", "not found")
+CRITICAL_ISSUE_PATTERN = re.compile("|".join(map(re.escape, CRITICAL_ISSUE_KEYWORDS)), re.IGNORECASE)
+
+STATUS_DESCRIPTIONS = MappingProxyType({
+    "FULLY_COMPLIANT": "meets all SAMA requirements and is ready for approval",
+    "MOSTLY_COMPLIANT": "meets most SAMA requirements with minor issues to resolve",
+    "PARTIALLY_COMPLIANT": "has submitted some required documents but significant gaps remain",
+    "NON_COMPLIANT": "does not meet minimum SAMA compliance requirements"
+})
+
+SUMMARY_TEXT_TEMPLATE = """
+SAMA COMPLIANCE SUMMARY - Customer {customer_id}
+
+Overall Assessment: {assessment}
+Compliance Score: {compliance_score:.1f}/100
+
+Document Status:
+- Total documents processed: {total_documents}
+- Valid documents: {valid_documents}
+- Validation rate: {validation_rate:.1%}
+- Required document coverage: {coverage:.1%}
+
+Key Findings:
+{all_clear_line}
+{missing_line}
+{critical_line}
+
+This assessment is based on Saudi Arabian Monetary Authority (SAMA) regulations
+for Small and Medium Enterprise (SME) account opening requirements.
+""".strip()
+
+@dataclass(frozen=True, slots=True)
+class SummaryEvent:
+    """Payload of the compliance-summary-generated event"""
+    customer_id: str
+    compliance_score: float
+    compliance_status: str
+    total_documents: int
+    valid_documents: int
+    generated_at: str
+
+@dataclass(slots=True)
+class DocumentRecord:
+    """Validation outcome of a single submitted document"""
+    filename: str
+    is_valid: bool
+    score: float
+    issues: List[str]
+    document_id: str
+
+@dataclass(slots=True)
+class DocAnalysis:
+    """Aggregated view over a customer's validation results"""
+    total_documents: int
+    valid_documents: int
+    validation_rate: float
+    average_score: float
+    documents_by_type: Dict[str, List[DocumentRecord]]
+    missing_documents: List[str]
+    critical_issues: List[str]
+    minor_issues: List[str]
+    required_documents_coverage: float
+    weighted_score: float
+    total_weight: float
+
+@dataclass(slots=True)
+class Recommendation:
+    """Actionable recommendation attached to a compliance summary"""
+    type: str
+    priority: str
+    title: str
+    description: str
+    action: str
+
+@dataclass(slots=True)
+class Summary:
+    """Compliance summary for one customer"""
+    customer_id: str
+    generated_at: str
+    compliance_score: float = 0.0
+    compliance_status: str = ""
+    document_analysis: Optional[DocAnalysis] = None
+    recommendations: List[Recommendation] = field(default_factory=list)
+    next_steps: List[str] = field(default_factory=list)
+    sama_requirements: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    summary_text: str = ""
+    error: Optional[str] = None
+
+@functools.cache
+def _kafka_handler_class():
+    """Import KafkaHandler on first use"""
+    try:
+        from ..shared.kafka_handler import KafkaHandler
+    except ImportError:
+        from copilots.compliance.shared.kafka_handler import KafkaHandler
+    return KafkaHandler
+
+@functools.cache
+def _database_probe():
+    """Import the database connection check (pulls in SQLAlchemy) on first use"""
+    try:
+        from ..shared.models import test_database_connection
+    except ImportError:
+        from copilots.compliance.shared.models import test_database_connection
+    return test_database_connection
+
 class ComplianceSummaryAgent:
     """
     Compliance Summary Agent
     Generates comprehensive compliance reports and recommendations
     """
     
-    def __init__(self):
-        self.config = Config()
-        self.kafka_handler = KafkaHandler()
-        
-        # Test database connection
-        print("🔍 Testing database connection for compliance summary...")
-        self.use_database = test_database_connection()
-        if not self.use_database:
-            print("⚠️  Database not available, using memory storage for summaries")
-            self.memory_summaries = {}
+    # SAMA compliance requirements
+    required_documents: ClassVar[Mapping[str, Mapping[str, str]]] = MappingProxyType({
+        "commercial_registration": MappingProxyType({
+            "name": "Commercial Registration Certificate",
+            "priority": "Critical",
+            "description": "Official business registration from Ministry of Commerce"
+        }),
+        "national_id": MappingProxyType({
+            "name": "National ID of Authorized Signatory", 
+            "priority": "Critical",
+            "description": "Valid Saudi National Identity Card"
+        }),
+        "bank_statements": MappingProxyType({
+            "name": "Bank Statements",
+            "priority": "High",
+            "description": "Recent bank statements showing business activity"
+        }),
+        "tax_certificate": MappingProxyType({
+            "name": "Tax Registration Certificate",
+            "priority": "High", 
+            "description": "VAT registration certificate from ZATCA"
+        })
+    })
+    _REQUIRED_DOC_KEYS: ClassVar[FrozenSet[str]] = frozenset(required_documents)
+    _CRITICAL_DOC_KEYS: ClassVar[FrozenSet[str]] = frozenset({"commercial_registration", "national_id"})
+    
+    # Weight scores by document importance
+    _DOC_WEIGHTS: ClassVar[Mapping[str, float]] = MappingProxyType({
+        "commercial_registration": 0.3,  # 30% - Critical
+        "national_id": 0.3,              # 30% - Critical
+        "bank_statements": 0.2,          # 20% - High
+        "tax_certificate": 0.2           # 20% - High
+    })
+    _DEFAULT_WEIGHT: ClassVar[float] = 0.1  # Default weight for unknown types
+    
+    # Next steps per compliance status
+    _NEXT_STEPS: ClassVar[Mapping[str, tuple]] = MappingProxyType({
+        "FULLY_COMPLIANT": (
+            "✅ Auto-approve for account opening",
+            "📧 Send welcome package to customer",
+            "🔄 Schedule account setup call",
+            "📋 Generate compliance certificate"
+        ),
+        "MOSTLY_COMPLIANT": (
+            "👤 Route to compliance officer for review",
+            "📞 Schedule verification call with customer",
+            "⏳ Prepare conditional approval",
+            "📋 Request minor document corrections"
+        ),
+        "PARTIALLY_COMPLIANT": (
+            "📄 Request missing documents",
+            "🔍 Schedule enhanced due diligence review",
+            "📞 Contact customer for clarification",
+            "⏳ Hold application pending improvements"
+        ),
+        "NON_COMPLIANT": (
+            "❌ Reject application with detailed feedback",
+            "📧 Send rejection letter with requirements",
+            "📋 Provide improvement roadmap",
+            "📞 Offer consultation call"
+        )
+    })
+    
+    def __init__(self, verbose: bool = False):
+        self.config = get_config()
+        self.verbose = verbose  # Print the formatted report after each summary
+        self.kafka_handler = _kafka_handler_class()()
         
-        # SAMA compliance requirements
-        self.required_documents = {
-            "commercial_registration": {
-                "name": "Commercial Registration Certificate",
-                "priority": "Critical",
-                "description": "Official business registration from Ministry of Commerce"
-            },
-            "national_id": {
-                "name": "National ID of Authorized Signatory", 
-                "priority": "Critical",
-                "description": "Valid Saudi National Identity Card"
-            },
-            "bank_statements": {
-                "name": "Bank Statements",
-                "priority": "High",
-                "description": "Recent bank statements showing business activity"
-            },
-            "tax_certificate": {
-                "name": "Tax Registration Certificate",
-                "priority": "High", 
-                "description": "VAT registration certificate from ZATCA"
-            }
-        }
+        # Database connection is tested on the first summary (see _check_database)
+        self.use_database = None
+        self.memory_summaries = OrderedDict()  # LRU, capped at config.MAX_MEMORY_SUMMARIES
         
         print("✅ Compliance Summary Agent initialized")
         print(f"📋 Monitoring {len(self.required_documents)} document types")
         
-    def generate_compliance_summary(self, customer_id: str, validation_results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def generate_compliance_summary(self, customer_id: str, validation_results: List[Dict[str, Any]]) -> Summary:
         """
         Generate comprehensive compliance summary for a customer
+        
+        Returns:
+            Summary dataclass (fields are attributes, not dict keys; dataclasses.asdict() gives a plain dict)
+        """
+        events = []
+        summary = self._build_summary(customer_id, validation_results, events)
+        self._emit_summary_events(events)
+        return summary
+    
+    def generate_compliance_summaries(self, batch: List[Tuple[str, List[Dict[str, Any]]]]) -> List[Summary]:
         """
-        print(f"\n📊 Generating compliance summary for customer: {customer_id}")
-        print(f"   📄 Processing {len(validation_results)} validation results")
+        Generate summaries for several customers, emitting all events in one Kafka batch
+        
+        Args:
+            batch: (customer_id, validation_results) pairs
+        """
+        events = []
+        summaries = [self._build_summary(customer_id, validation_results, events)
+                     for customer_id, validation_results in batch]
+        self._emit_summary_events(events)
+        return summaries
+    
+    def _build_summary(self, customer_id: str, validation_results: List[Dict[str, Any]],
+                       events: List[Tuple[str, SummaryEvent]]) -> Summary:
+        """Build and store one summary; its Kafka event is appended to events, not sent"""
+        logger.info("📊 Generating compliance summary for customer %s (%d validation results)",
+                    customer_id, len(validation_results))
+        generated_at = datetime.now(timezone.utc).isoformat()
+        
+        if not validation_results:
+            # Stored so get_summary() finds it, but nothing happened worth a Kafka event
+            return self._finish_summary(self._empty_summary(customer_id, generated_at), events=None)
         
         try:
             # Analyze validation results
             analysis = self._analyze_validation_results(validation_results)
             
             # Calculate overall compliance score
-            compliance_score = self._calculate_compliance_score(validation_results)
+            compliance_score = self._calculate_compliance_score(analysis)
             
             # Determine compliance status
             compliance_status = self._determine_compliance_status(compliance_score, analysis)
@@ -91,147 +264,193 @@ class ComplianceSummaryAgent:
             next_steps = self._determine_next_steps(compliance_status, analysis)
             
             # Create comprehensive summary
-            summary = {
-                "customer_id": customer_id,
-                "generated_at": datetime.now().isoformat(),
-                "compliance_score": compliance_score,
-                "compliance_status": compliance_status,
-                "document_analysis": analysis,
-                "recommendations": recommendations,
-                "next_steps": next_steps,
-                "sama_requirements": self._get_sama_requirements_status(analysis),
-                "summary_text": self._generate_summary_text(customer_id, compliance_score, compliance_status, analysis)
-            }
-            
-            # Store summary
-            if self.use_database:
-                self._store_summary(summary)
-            else:
-                self.memory_summaries[customer_id] = summary
-            
-            # Emit summary completion event
-            self.kafka_handler.send_event(
-                topic="compliance-summary-generated",
-                key=customer_id,
-                value={
-                    "customer_id": customer_id,
-                    "compliance_score": compliance_score,
-                    "compliance_status": compliance_status,
-                    "total_documents": len(validation_results),
-                    "valid_documents": analysis["valid_documents"],
-                    "generated_at": summary["generated_at"]
-                }
+            summary = Summary(
+                customer_id=customer_id,
+                generated_at=generated_at,
+                compliance_score=compliance_score,
+                compliance_status=compliance_status,
+                document_analysis=analysis,
+                recommendations=recommendations,
+                next_steps=next_steps,
+                sama_requirements=self._get_sama_requirements_status(analysis),
+                summary_text=self._generate_summary_text(customer_id, compliance_score, compliance_status, analysis)
             )
             
-            # Print summary
-            self._print_compliance_summary(summary)
-            
-            return summary
+            return self._finish_summary(summary, events)
             
         except Exception as e:
-            error_summary = {
-                "customer_id": customer_id,
-                "error": str(e),
-                "generated_at": datetime.now().isoformat()
-            }
+            error_summary = Summary(
+                customer_id=customer_id,
+                generated_at=generated_at,
+                error=str(e)
+            )
             
-            print(f"❌ Error generating compliance summary: {e}")
-            logger.error(f"Compliance summary error for {customer_id}: {e}")
+            logger.error("Compliance summary error for %s: %s", customer_id, e)
             
             return error_summary
     
-    def _analyze_validation_results(self, validation_results: List[Dict[str, Any]]) -> Dict[str, Any]:
-        """Analyze validation results to understand compliance status"""
-        print("   🔍 Analyzing validation results...")
+    def _finish_summary(self, summary: Summary, events: Optional[List[Tuple[str, SummaryEvent]]]) -> Summary:
+        """Store a built summary and queue its completion event (none if events is None)"""
+        customer_id = summary.customer_id
+        analysis = summary.document_analysis
+        
+        # Store summary
+        if self._check_database():
+            self._store_summary(summary)
+        else:
+            self._remember_summary(customer_id, summary)
+        
+        # Queue summary completion event
+        if events is not None:
+            events.append((customer_id, SummaryEvent(
+                customer_id=customer_id,
+                compliance_score=summary.compliance_score,
+                compliance_status=summary.compliance_status,
+                total_documents=analysis.total_documents,
+                valid_documents=analysis.valid_documents,
+                generated_at=summary.generated_at
+            )))
         
+        # Print summary
+        if self.verbose:
+            self._print_compliance_summary(summary)
+        
+        return summary
+    
+    def _emit_summary_events(self, events: List[Tuple[str, SummaryEvent]]):
+        """Send queued summary completion events"""
+        if events:
+            self.kafka_handler.send_events_batch("compliance-summary-generated", events)
+    
+    def _empty_summary(self, customer_id: str, generated_at: str) -> Summary:
+        """NON_COMPLIANT summary for a customer with no validation results"""
+        logger.info("No validation results for customer %s, skipping analysis", customer_id)
+        compliance_status = "NON_COMPLIANT"
+        analysis = DocAnalysis(
+            total_documents=0,
+            valid_documents=0,
+            validation_rate=0,
+            average_score=0,
+            documents_by_type={},
+            missing_documents=list(self.required_documents),
+            critical_issues=[],
+            minor_issues=[],
+            required_documents_coverage=0.0,
+            weighted_score=0,
+            total_weight=0
+        )
+        return Summary(
+            customer_id=customer_id,
+            generated_at=generated_at,
+            compliance_score=0.0,
+            compliance_status=compliance_status,
+            document_analysis=analysis,
+            recommendations=self._generate_recommendations(analysis, 0.0),
+            next_steps=self._determine_next_steps(compliance_status, analysis),
+            sama_requirements=self._get_sama_requirements_status(analysis),
+            summary_text=self._generate_summary_text(customer_id, 0.0, compliance_status, analysis)
+        )
+    
+    def _check_database(self) -> bool:
+        """Test the database connection once, on first use"""
+        if self.use_database is None:
+            print("🔍 Testing database connection for compliance summary...")
+            self.use_database = _database_probe()()
+            if not self.use_database:
+                print("⚠️  Database not available, using memory storage for summaries")
+        return self.use_database
+    
+    def _remember_summary(self, customer_id: str, summary: Summary):
+        """Store a summary in memory, evicting the least recently used beyond the cap"""
+        self.memory_summaries[customer_id] = summary
+        self.memory_summaries.move_to_end(customer_id)
+        while len(self.memory_summaries) > self.config.MAX_MEMORY_SUMMARIES:
+            self.memory_summaries.popitem(last=False)
+    
+    def get_summary(self, customer_id: str) -> Optional[Summary]:
+        """Retrieve the latest in-memory summary for a customer"""
+        summary = self.memory_summaries.get(customer_id)
+        if summary is not None:
+            self.memory_summaries.move_to_end(customer_id)
+        return summary
+    
+    def _analyze_validation_results(self, validation_results: List[Dict[str, Any]]) -> DocAnalysis:
+        """Analyze validation results to understand compliance status"""
         total_documents = len(validation_results)
-        valid_documents = sum(1 for result in validation_results if result.get('is_valid', False))
+        valid_documents = 0
+        score_sum = 0
+        weighted_score = 0
+        total_weight = 0
+        doc_weights = self._DOC_WEIGHTS
+        default_weight = self._DEFAULT_WEIGHT
         
-        # Group by document type
+        # Group by document type and bucket issues in a single pass
         documents_by_type = {}
-        validation_scores = []
-        all_issues = []
+        critical_issues = []
+        minor_issues = []
         
         for result in validation_results:
-            doc_type = result.get('document_type', 'unknown')
+            # Interned so repeated type strings from deserialized results share one object
+            doc_type = sys.intern(result.get('document_type') or 'unknown')
             score = result.get('validation_score', 0)
             is_valid = result.get('is_valid', False)
             issues = result.get('issues', [])
             
-            validation_scores.append(score)
-            all_issues.extend(issues)
+            if is_valid:
+                valid_documents += 1
+            score_sum += score
+            weight = doc_weights.get(doc_type, default_weight)
+            weighted_score += score * weight
+            total_weight += weight
             
-            if doc_type not in documents_by_type:
-                documents_by_type[doc_type] = []
+            for issue in issues:
+                if CRITICAL_ISSUE_PATTERN.search(issue) is not None:
+                    critical_issues.append(issue)
+                else:
+                    minor_issues.append(issue)
             
-            documents_by_type[doc_type].append({
-                "filename": result.get('filename', 'Unknown'),
-                "is_valid": is_valid,
-                "score": score,
-                "issues": issues,
-                "document_id": result.get('document_id', 'Unknown')
-            })
+            documents_by_type.setdefault(doc_type, []).append(DocumentRecord(
+                filename=result.get('filename', 'Unknown'),
+                is_valid=is_valid,
+                score=score,
+                issues=issues,
+                document_id=result.get('document_id', 'Unknown')
+            ))
         
         # Calculate statistics
-        avg_score = sum(validation_scores) / len(validation_scores) if validation_scores else 0
+        avg_score = score_sum / total_documents if total_documents else 0
         
         # Check required documents coverage
-        missing_documents = []
-        for req_doc_type in self.required_documents.keys():
-            if req_doc_type not in documents_by_type:
-                missing_documents.append(req_doc_type)
-        
-        # Categorize issues
-        critical_issues = [issue for issue in all_issues if any(keyword in issue.lower() 
-                          for keyword in ['number not found', 'not detected', 'not found'])]
-        minor_issues = [issue for issue in all_issues if issue not in critical_issues]
+        missing = self._REQUIRED_DOC_KEYS - documents_by_type.keys()
+        missing_documents = [doc_type for doc_type in self.required_documents if doc_type in missing]
         
-        analysis = {
-            "total_documents": total_documents,
-            "valid_documents": valid_documents,
-            "validation_rate": valid_documents / total_documents if total_documents > 0 else 0,
-            "average_score": avg_score,
-            "documents_by_type": documents_by_type,
-            "missing_documents": missing_documents,
-            "critical_issues": critical_issues,
-            "minor_issues": minor_issues,
-            "required_documents_coverage": len(documents_by_type) / len(self.required_documents)
-        }
+        analysis = DocAnalysis(
+            total_documents=total_documents,
+            valid_documents=valid_documents,
+            validation_rate=valid_documents / total_documents if total_documents > 0 else 0,
+            average_score=avg_score,
+            documents_by_type=documents_by_type,
+            missing_documents=missing_documents,
+            critical_issues=critical_issues,
+            minor_issues=minor_issues,
+            required_documents_coverage=len(documents_by_type) / len(self.required_documents),
+            weighted_score=weighted_score,
+            total_weight=total_weight
+        )
         
-        print(f"   📊 Analysis complete: {valid_documents}/{total_documents} valid, avg score: {avg_score:.1f}")
+        logger.debug("Analysis complete: %d/%d valid, avg score: %.1f",
+                     valid_documents, total_documents, avg_score)
         
         return analysis
     
-    def _calculate_compliance_score(self, validation_results: List[Dict[str, Any]]) -> float:
-        """Calculate overall compliance score"""
-        if not validation_results:
-            return 0.0
-        
-        # Weight scores by document importance
-        weights = {
-            "commercial_registration": 0.3,  # 30% - Critical
-            "national_id": 0.3,              # 30% - Critical
-            "bank_statements": 0.2,          # 20% - High
-            "tax_certificate": 0.2           # 20% - High
-        }
-        
-        weighted_score = 0
-        total_weight = 0
-        
-        for result in validation_results:
-            doc_type = result.get('document_type', 'unknown')
-            score = result.get('validation_score', 0)
-            weight = weights.get(doc_type, 0.1)  # Default weight for unknown types
-            
-            weighted_score += score * weight
-            total_weight += weight
-        
-        return weighted_score / total_weight if total_weight > 0 else 0
+    def _calculate_compliance_score(self, analysis: DocAnalysis) -> float:
+        """Calculate overall compliance score from the weighted sums in the analysis"""
+        total_weight = analysis.total_weight
+        return analysis.weighted_score / total_weight if total_weight > 0 else 0.0
     
-    def _determine_compliance_status(self, compliance_score: float, analysis: Dict[str, Any]) -> str:
+    def _determine_compliance_status(self, compliance_score: float, analysis: DocAnalysis) -> str:
         """Determine overall compliance status"""
-        missing_critical = any(doc_type in analysis["missing_documents"] 
-                             for doc_type in ["commercial_registration", "national_id"])
+        missing_critical = not self._CRITICAL_DOC_KEYS.isdisjoint(analysis.missing_documents)
         
         if compliance_score >= 90 and not missing_critical:
             return "FULLY_COMPLIANT"
@@ -242,165 +461,128 @@ class ComplianceSummaryAgent:
         else:
             return "NON_COMPLIANT"
     
-    def _generate_recommendations(self, analysis: Dict[str, Any], compliance_score: float) -> List[Dict[str, Any]]:
+    def _generate_recommendations(self, analysis: DocAnalysis, compliance_score: float) -> List[Recommendation]:
         """Generate actionable recommendations"""
         recommendations = []
         
         # Missing documents
-        for missing_doc in analysis["missing_documents"]:
+        for missing_doc in analysis.missing_documents:
             doc_info = self.required_documents.get(missing_doc, {})
-            recommendations.append({
-                "type": "MISSING_DOCUMENT",
-                "priority": doc_info.get("priority", "Medium"),
-                "title": f"Submit {doc_info.get('name', missing_doc)}",
-                "description": doc_info.get('description', f"Please provide {missing_doc}"),
-                "action": f"Upload valid {doc_info.get('name', missing_doc)}"
-            })
+            recommendations.append(Recommendation(
+                type="MISSING_DOCUMENT",
+                priority=doc_info.get("priority", "Medium"),
+                title=f"Submit {doc_info.get('name', missing_doc)}",
+                description=doc_info.get('description', f"Please provide {missing_doc}"),
+                action=f"Upload valid {doc_info.get('name', missing_doc)}"
+            ))
         
         # Critical issues
-        if analysis["critical_issues"]:
-            recommendations.append({
-                "type": "CRITICAL_ISSUES", 
-                "priority": "Critical",
-                "title": f"Resolve {len(analysis['critical_issues'])} critical issues",
-                "description": "Document validation failed for critical requirements",
-                "action": "Review and resubmit documents with clear, readable information"
-            })
+        if analysis.critical_issues:
+            recommendations.append(Recommendation(
+                type="CRITICAL_ISSUES", 
+                priority="Critical",
+                title=f"Resolve {len(analysis.critical_issues)} critical issues",
+                description="Document validation failed for critical requirements",
+                action="Review and resubmit documents with clear, readable information"
+            ))
         
         # Score-based recommendations
         if compliance_score < 70:
-            recommendations.append({
-                "type": "OVERALL_COMPLIANCE",
-                "priority": "High",
-                "title": "Improve overall compliance score",
-                "description": f"Current score: {compliance_score:.1f}/100",
-                "action": "Focus on document quality and completeness"
-            })
+            recommendations.append(Recommendation(
+                type="OVERALL_COMPLIANCE",
+                priority="High",
+                title="Improve overall compliance score",
+                description=f"Current score: {compliance_score:.1f}/100",
+                action="Focus on document quality and completeness"
+            ))
         
         return recommendations
     
-    def _determine_next_steps(self, compliance_status: str, analysis: Dict[str, Any]) -> List[str]:
+    def _determine_next_steps(self, compliance_status: str, analysis: DocAnalysis) -> List[str]:
         """Determine next steps based on compliance status"""
-        if compliance_status == "FULLY_COMPLIANT":
-            return [
-                "✅ Auto-approve for account opening",
-                "📧 Send welcome package to customer",
-                "🔄 Schedule account setup call",
-                "📋 Generate compliance certificate"
-            ]
-        elif compliance_status == "MOSTLY_COMPLIANT":
-            return [
-                "👤 Route to compliance officer for review",
-                "📞 Schedule verification call with customer",
-                "⏳ Prepare conditional approval",
-                "📋 Request minor document corrections"
-            ]
-        elif compliance_status == "PARTIALLY_COMPLIANT":
-            return [
-                "📄 Request missing documents",
-                "🔍 Schedule enhanced due diligence review",
-                "📞 Contact customer for clarification",
-                "⏳ Hold application pending improvements"
-            ]
-        else:  # NON_COMPLIANT
-            return [
-                "❌ Reject application with detailed feedback",
-                "📧 Send rejection letter with requirements",
-                "📋 Provide improvement roadmap",
-                "📞 Offer consultation call"
-            ]
+        return list(self._NEXT_STEPS.get(compliance_status, self._NEXT_STEPS["NON_COMPLIANT"]))
     
-    def _get_sama_requirements_status(self, analysis: Dict[str, Any]) -> Dict[str, Any]:
+    def _get_sama_requirements_status(self, analysis: DocAnalysis) -> Dict[str, Any]:
         """Get SAMA requirements compliance status"""
-        requirements_status = {}
-        
-        for doc_type, doc_info in self.required_documents.items():
-            if doc_type in analysis["documents_by_type"]:
-                doc_results = analysis["documents_by_type"][doc_type]
-                valid_docs = [doc for doc in doc_results if doc["is_valid"]]
-                
-                requirements_status[doc_type] = {
-                    "name": doc_info["name"],
-                    "status": "SATISFIED" if valid_docs else "FAILED",
-                    "submitted": len(doc_results),
-                    "valid": len(valid_docs),
-                    "priority": doc_info["priority"]
-                }
-            else:
-                requirements_status[doc_type] = {
-                    "name": doc_info["name"], 
-                    "status": "MISSING",
-                    "submitted": 0,
-                    "valid": 0,
-                    "priority": doc_info["priority"]
-                }
+        docs_by_type = analysis.documents_by_type
+        return {
+            doc_type: self._requirement_status(doc_info, docs_by_type.get(doc_type))
+            for doc_type, doc_info in self.required_documents.items()
+        }
+    
+    @staticmethod
+    def _requirement_status(doc_info: Mapping[str, str], docs: Optional[List[DocumentRecord]]) -> Dict[str, Any]:
+        """Status entry for one required document type"""
+        if not docs:
+            return {
+                "name": doc_info["name"], 
+                "status": "MISSING",
+                "submitted": 0,
+                "valid": 0,
+                "priority": doc_info["priority"]
+            }
         
-        return requirements_status
+        valid = sum(1 for doc in docs if doc.is_valid)
+        return {
+            "name": doc_info["name"],
+            "status": "SATISFIED" if valid else "FAILED",
+            "submitted": len(docs),
+            "valid": valid,
+            "priority": doc_info["priority"]
+        }
     
     def _generate_summary_text(self, customer_id: str, compliance_score: float, 
-                             compliance_status: str, analysis: Dict[str, Any]) -> str:
+                             compliance_status: str, analysis: DocAnalysis) -> str:
         """Generate human-readable summary text"""
-        status_descriptions = {
-            "FULLY_COMPLIANT": "meets all SAMA requirements and is ready for approval",
-            "MOSTLY_COMPLIANT": "meets most SAMA requirements with minor issues to resolve",
-            "PARTIALLY_COMPLIANT": "has submitted some required documents but significant gaps remain",
-            "NON_COMPLIANT": "does not meet minimum SAMA compliance requirements"
-        }
-        
-        summary_text = f"""
-SAMA COMPLIANCE SUMMARY - Customer {customer_id}
-
-Overall Assessment: {status_descriptions.get(compliance_status, 'Status unclear')}
-Compliance Score: {compliance_score:.1f}/100
-
-Document Status:
-- Total documents processed: {analysis['total_documents']}
-- Valid documents: {analysis['valid_documents']}
-- Validation rate: {analysis['validation_rate']:.1%}
-- Required document coverage: {analysis['required_documents_coverage']:.1%}
-
-Key Findings:
-{'- All critical documents validated successfully' if not analysis['missing_documents'] and not analysis['critical_issues'] else ''}
-{'- Missing critical documents: ' + ', '.join(analysis['missing_documents']) if analysis['missing_documents'] else ''}
-{'- Critical validation issues identified: ' + str(len(analysis['critical_issues'])) if analysis['critical_issues'] else ''}
-
-This assessment is based on Saudi Arabian Monetary Authority (SAMA) regulations
-for Small and Medium Enterprise (SME) account opening requirements.
-        """.strip()
+        missing_documents = analysis.missing_documents
+        critical_issues = analysis.critical_issues
         
-        return summary_text
+        return SUMMARY_TEXT_TEMPLATE.format_map({
+            "customer_id": customer_id,
+            "assessment": STATUS_DESCRIPTIONS.get(compliance_status, 'Status unclear'),
+            "compliance_score": compliance_score,
+            "total_documents": analysis.total_documents,
+            "valid_documents": analysis.valid_documents,
+            "validation_rate": analysis.validation_rate,
+            "coverage": analysis.required_documents_coverage,
+            "all_clear_line": '- All critical documents validated successfully'
+                if not missing_documents and not critical_issues else '',
+            "missing_line": '- Missing critical documents: ' + ', '.join(missing_documents)
+                if missing_documents else '',
+            "critical_line": '- Critical validation issues identified: ' + str(len(critical_issues))
+                if critical_issues else ''
+        })
     
-    def _store_summary(self, summary: Dict[str, Any]):
+    def _store_summary(self, summary: Summary):
         """Store compliance summary in database"""
         try:
             # In a real implementation, this would store in a ComplianceSummary table
-            print("     💾 Compliance summary stored in database")
+            logger.debug("💾 Compliance summary stored in database")
         except Exception as e:
-            logger.error(f"Database storage error: {e}")
-            print(f"     ❌ Database storage failed: {e}")
+            logger.error("Database storage error: %s", e)
     
-    def _print_compliance_summary(self, summary: Dict[str, Any]):
+    def _print_compliance_summary(self, summary: Summary):
         """Print a formatted compliance summary"""
         print(f"\n📊 COMPLIANCE SUMMARY REPORT")
         print(f"=" * 60)
-        print(f"👤 Customer: {summary['customer_id']}")
-        print(f"📅 Generated: {summary['generated_at'][:19]}")
-        print(f"📊 Score: {summary['compliance_score']:.1f}/100")
-        print(f"🎯 Status: {summary['compliance_status']}")
+        print(f"👤 Customer: {summary.customer_id}")
+        print(f"📅 Generated: {summary.generated_at[:19]}")
+        print(f"📊 Score: {summary.compliance_score:.1f}/100")
+        print(f"🎯 Status: {summary.compliance_status}")
         
-        analysis = summary['document_analysis']
+        analysis = summary.document_analysis
         print(f"\n📄 Document Analysis:")
-        print(f"   📊 Total: {analysis['total_documents']}")
-        print(f"   ✅ Valid: {analysis['valid_documents']}")
-        print(f"   📈 Success Rate: {analysis['validation_rate']:.1%}")
+        print(f"   📊 Total: {analysis.total_documents}")
+        print(f"   ✅ Valid: {analysis.valid_documents}")
+        print(f"   📈 Success Rate: {analysis.validation_rate:.1%}")
         
-        if summary['recommendations']:
-            print(f"\n💡 Recommendations ({len(summary['recommendations'])}):")
-            for rec in summary['recommendations']:
-                print(f"   🔸 {rec['title']} ({rec['priority']})")
+        if summary.recommendations:
+            print(f"\n💡 Recommendations ({len(summary.recommendations)}):")
+            for rec in summary.recommendations:
+                print(f"   🔸 {rec.title} ({rec.priority})")
         
         print(f"\n🎯 Next Steps:")
-        for step in summary['next_steps']:
+        for step in summary.next_steps:
             print(f"   {step}")
         
         print(f"=" * 60)
@@ -413,7 +595,7 @@ def test_compliance_summary_agent():
     print("=" * 60)
     
     # Create agent
-    agent = ComplianceSummaryAgent()
+    agent = ComplianceSummaryAgent(verbose=True)
     
     # Sample validation results (like what would come from KYC agent)
     sample_validation_results = [
@@ -457,8 +639,8 @@ def test_compliance_summary_agent():
     summary = agent.generate_compliance_summary("CUST123", sample_validation_results)
     
     print(f"\n🎉 TESTING COMPLETE!")
-    print(f"Summary generated for customer: {summary.get('customer_id', 'Unknown')}")
-    print(f"Compliance status: {summary.get('compliance_status', 'Unknown')}")
+    print(f"Summary generated for customer: {summary.customer_id}")
+    print(f"Compliance status: {summary.compliance_status or 'Unknown'}")
     
     return agent, summary
 
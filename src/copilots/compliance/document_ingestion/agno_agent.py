@@ -1,11 +1,21 @@
 # src/copilots/compliance/document_ingestion/agno_agent.py
+import asyncio
+import copy
 import hashlib
-import io
+import importlib.util
+import mmap
 import os
+import re
+import sqlite3
+import threading
+from array import array
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime
 from typing import Dict, Any, List, Optional
-import PyPDF2
+import pypdfium2 as pdfium
 import logging
+from sqlalchemy.orm import scoped_session, sessionmaker
 
 # Agno imports
 try:
@@ -21,8 +31,8 @@ except ImportError as e:
 # Local imports
 try:
     from ..shared.kafka_handler import KafkaHandler
-    from ..shared.models import Document, get_database_session, create_tables, test_database_connection
-    from ..agno_config import config
+    from ..shared.models import Document, get_database_engine, create_tables, test_database_connection
+    from ..agno_config import get_config, ensure_validated
 except ImportError:
     import sys
     import os
@@ -30,21 +40,92 @@ except ImportError:
     parent_dir = os.path.dirname(os.path.dirname(os.path.dirname(current_dir)))
     sys.path.insert(0, parent_dir)
     from copilots.compliance.shared.kafka_handler import KafkaHandler
-    from copilots.compliance.shared.models import Document, get_database_session, create_tables, test_database_connection
-    from copilots.compliance.agno_config import config
+    from copilots.compliance.shared.models import Document, get_database_engine, create_tables, test_database_connection
+    from copilots.compliance.agno_config import get_config, ensure_validated
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Batch embedding methods, tried in order before falling back to one get_embedding() call per chunk
+EMBEDDER_BATCH_METHODS = ("get_embeddings", "embed_documents")
+
+def _page_texts(pdf, start: int, end: int) -> List[str]:
+    """Extract the text of pages [start, end) from an open PDFium document"""
+    texts = []
+    for index in range(start, end):
+        page = pdf[index]
+        textpage = page.get_textpage()
+        texts.append(textpage.get_text_range())
+        textpage.close()
+        page.close()
+    return texts
+
+def _extract_page_range(source: str, start: int, end: int) -> List[str]:
+    """Process-pool worker: reopen the PDF from its path and extract a page range"""
+    pdf = pdfium.PdfDocument(source)
+    try:
+        return _page_texts(pdf, start, end)
+    finally:
+        pdf.close()
+
+def _keyword_lookahead(table: Dict[str, tuple]) -> str:
+    """Build a zero-width, overlapping-match alternation with one named group per category"""
+    alternatives = "|".join(
+        f"(?P<{category}>{'|'.join(map(re.escape, keywords))})"
+        for category, keywords in table.items()
+    )
+    return f"(?=(?:{alternatives}))"
+
 class AgnoDocumentIngestionAgent(Agent if AGNO_AVAILABLE else object):
     """
     Enhanced Document Ingestion Agent with Agno Framework
     Features vector storage, intelligent analysis, and workflow orchestration
     """
     
+    # Precompiled content checks (scanned in C rather than per character in Python)
+    _DIGIT_RE = re.compile(r'\d')
+    _STRUCT_RE = re.compile(r'[-/:()]')
+    _ARABIC_RE = re.compile(r'[\u0600-\u06FF]')
+    
+    _META_LIMIT = 3
+    
+    # Classification keywords per document type
+    _CONTENT_KEYWORDS = {
+        "commercial_registration": ("commercial registration", "تجاري", "ministry of commerce",
+                                    "registration number", "company name", "business activity"),
+        "national_id": ("national identity", "هوية وطنية", "identity card", "id number"),
+        "bank_statement": ("bank statement", "account number", "balance", "transaction", "sar"),
+        "tax_certificate": ("tax certificate", "vat", "ضريبة", "zatca", "tax registration")
+    }
+    _FILENAME_KEYWORDS = {
+        "commercial_registration": ("commercial", "registration", "cr"),
+        "national_id": ("national", "id", "identity"),
+        "bank_statement": ("bank", "statement", "account"),
+        "tax_certificate": ("tax", "vat", "certificate")
+    }
+    _FILENAME_KEYWORD_RE = re.compile(_keyword_lookahead(_FILENAME_KEYWORDS))
+    
+    # Fallback filename guesses, checked in priority order
+    _GUESS_KEYWORDS = (
+        ("commercial", "commercial_registration"),
+        ("national", "national_id"),
+        ("id", "national_id"),
+        ("bank", "bank_statement"),
+        ("tax", "tax_certificate"),
+        ("vat", "tax_certificate")
+    )
+    
+    # One pass over the text: content keywords (all start with a letter) plus the
+    # metadata dates and long numbers (start with a digit), so branches never compete
+    _TEXT_SCAN_RE = re.compile(
+        _keyword_lookahead(_CONTENT_KEYWORDS)
+        + r'|(?P<date>\d{4}[-/]\d{2}[-/]\d{2}|\d{2}[-/]\d{2}[-/]\d{4})|(?P<number>\b\d{10,}\b)'
+    )
+    
     def __init__(self):
-        self.config = config
+        self.config = get_config()
+        ensure_validated()
         
         # Initialize Agno Agent if available
         if AGNO_AVAILABLE and self.config.USE_AGNO:
@@ -63,22 +144,38 @@ class AgnoDocumentIngestionAgent(Agent if AGNO_AVAILABLE else object):
                 print(f"⚠️  Agno initialization failed: {e}")
                 print("   Falling back to basic functionality")
                 self.agno_enabled = False
+                self.knowledge = None
         else:
             self.agno_enabled = False
+            self.knowledge = None
             print("📄 Using basic document agent")
         
         # Initialize supporting components
         self.kafka_handler = KafkaHandler()
+        self._pdf_pool = None  # Created on the first PDF large enough to need it
+        self._pdf_workers = os.cpu_count() or 1
+        self._emb_cache = None  # Opened on the first upsert that embeds locally
+        self._io_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="agno-io")
+        self._analysis_cache = OrderedDict()  # LRU, capped at config.ANALYSIS_CACHE_SIZE
+        self.stats = {"analysis_cache_hits": 0, "analysis_cache_misses": 0}
+        self._cache_lock = threading.Lock()  # Guards both caches when documents run concurrently
         
         # Test database connection
         print("🔍 Testing database connection...")
         if test_database_connection():
             create_tables()
             self.use_database = True
+            # One pooled engine for the agent's lifetime, one session per I/O thread
+            self._db_engine = get_database_engine()
+            self._sessions = scoped_session(
+                sessionmaker(autocommit=False, autoflush=False, bind=self._db_engine)
+            )
             print("✅ Database ready!")
         else:
             print("⚠️  Database not available, using memory storage")
             self.use_database = False
+            self._db_engine = None
+            self._sessions = None
             self.memory_storage = {}
     
     def _get_agent_instructions(self) -> str:
@@ -105,13 +202,18 @@ class AgnoDocumentIngestionAgent(Agent if AGNO_AVAILABLE else object):
             # Create data directory if it doesn't exist
             os.makedirs("./data", exist_ok=True)
             
-            # Setup ChromaDB vector knowledge
+            # Vector backend is config-driven; FAISS needs the faiss package
+            vector_db = self.config.VECTOR_DB_TYPE
+            if vector_db == "faiss" and importlib.util.find_spec("faiss") is None:
+                print("⚠️  faiss not installed, using chroma vector store")
+                vector_db = "chroma"
+            
             knowledge = VectorKnowledge(
-                vector_db="chroma",
-                path=self.config.CHROMA_DB_PATH,
+                vector_db=vector_db,
+                path=self.config.FAISS_INDEX_PATH if vector_db == "faiss" else self.config.CHROMA_DB_PATH,
                 collection_name="compliance_documents"
             )
-            print("📚 Vector knowledge base initialized")
+            print(f"📚 Vector knowledge base initialized ({vector_db})")
             return knowledge
             
         except Exception as e:
@@ -132,6 +234,10 @@ class AgnoDocumentIngestionAgent(Agent if AGNO_AVAILABLE else object):
             if result["status"] != "success":
                 return result
             
+            if result.get("deduplicated"):
+                self._emit_deduplicated_event(result)
+                return result
+            
             # Enhanced processing if Agno is enabled
             if self.agno_enabled:
                 print("   🧠 Running enhanced analysis...")
@@ -149,23 +255,26 @@ class AgnoDocumentIngestionAgent(Agent if AGNO_AVAILABLE else object):
                     "quality_assessment": enhanced_analysis.get("quality", 0.7),
                     "agno_enhanced": True
                 })
-                
-                # Store in vector database
-                if self.knowledge:
-                    self._store_in_vector_knowledge(result)
-                    print("   📚 Stored in vector knowledge base")
-                
             else:
                 print("   📄 Using basic processing")
                 result["agno_enhanced"] = False
             
-            # Store in database
+            # Vector store and database writes are independent I/O: run them concurrently
+            io_tasks = []
+            if self.agno_enabled and self.knowledge:
+                io_tasks.append(self._store_in_vector_knowledge)
             if self.use_database:
-                self._store_in_database(result)
+                io_tasks.append(self._store_in_database)
             else:
                 self.memory_storage[result["document_id"]] = result
             
-            # Emit enhanced events
+            # Wait for both writes so consumers of the events below can find the document
+            for future in [self._io_pool.submit(task, result) for task in io_tasks]:
+                future.result()
+            
+            if self._store_in_vector_knowledge in io_tasks:
+                print("   📚 Stored in vector knowledge base")
+            
             self._emit_enhanced_events(result)
             
             print(f"✅ Document processing complete: {result['document_id']}")
@@ -181,6 +290,16 @@ class AgnoDocumentIngestionAgent(Agent if AGNO_AVAILABLE else object):
             logger.error(f"Enhanced document processing error: {e}")
             return error_result
     
+    async def process_document_enhanced_async(self, file_path: str, customer_id: str = None) -> Dict[str, Any]:
+        """Async variant: run the blocking pipeline in a worker thread"""
+        return await asyncio.to_thread(self.process_document_enhanced, file_path, customer_id)
+    
+    async def process_documents_enhanced_async(self, file_paths: List[str], customer_id: str = None) -> List[Dict[str, Any]]:
+        """Process several documents concurrently (results in input order)"""
+        return await asyncio.gather(*(
+            self.process_document_enhanced_async(file_path, customer_id) for file_path in file_paths
+        ))
+    
     def _basic_document_processing(self, file_path: str, customer_id: str = None) -> Dict[str, Any]:
         """Basic document processing (reusing existing logic)"""
         # Validate file
@@ -193,19 +312,31 @@ class AgnoDocumentIngestionAgent(Agent if AGNO_AVAILABLE else object):
         
         print(f"   📊 File info: {filename} ({file_size} bytes, {file_ext})")
         
-        # Generate document ID
-        doc_id = hashlib.md5(f"{file_path}_{customer_id}_{datetime.now().isoformat()}".encode()).hexdigest()
-        
-        # Extract text
-        with open(file_path, 'rb') as file:
-            file_content = file.read()
+        # Map the file instead of copying it onto the heap (only the descriptor is needed, so no buffer)
+        with open(file_path, 'rb', buffering=0) as file:
+            file_content = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) if file_size else b''
         
-        if file_ext == '.pdf':
-            extracted_text = self._extract_pdf_text(file_content)
-        elif file_ext == '.txt':
-            extracted_text = file_content.decode('utf-8')
-        else:
-            extracted_text = f"Unsupported file type: {file_ext}"
+        try:
+            # Content-addressed document ID: re-uploads by the same customer map to the same document
+            key = hashlib.blake2b(customer_id.encode()).digest() if customer_id else b''
+            doc_id = hashlib.blake2b(file_content, digest_size=16, key=key).hexdigest()
+            
+            existing = self._find_existing_document(doc_id) if self.config.DEDUPLICATE_DOCUMENTS else None
+            if existing is not None:
+                print(f"   ♻️  Already processed: {doc_id}")
+                return {**existing, "deduplicated": True}
+            
+            # Extract text
+            if file_ext == '.pdf':
+                # PDFium loads pages from the file on demand
+                extracted_text = self._extract_pdf_text(file_path)
+            elif file_ext == '.txt':
+                extracted_text = str(file_content, 'utf-8', 'replace')
+            else:
+                extracted_text = f"Unsupported file type: {file_ext}"
+        finally:
+            if isinstance(file_content, mmap.mmap):
+                file_content.close()
         
         print(f"   📝 Extracted {len(extracted_text)} characters")
         
@@ -221,23 +352,49 @@ class AgnoDocumentIngestionAgent(Agent if AGNO_AVAILABLE else object):
         }
     
     def _run_enhanced_analysis(self, text: str, filename: str) -> Dict[str, Any]:
-        """Run enhanced document analysis"""
+        """Run enhanced document analysis, reusing cached results for repeated uploads"""
+        cache_key = (filename.lower(), hashlib.blake2b(text.encode(), digest_size=16).digest())
+        with self._cache_lock:
+            cached = self._analysis_cache.get(cache_key)
+            if cached is not None:
+                self._analysis_cache.move_to_end(cache_key)
+                self.stats["analysis_cache_hits"] += 1
+                return copy.deepcopy(cached)
+            self.stats["analysis_cache_misses"] += 1
+        
+        analysis = self._analyze_document(text, filename)
+        if analysis["analysis_method"] != "fallback":
+            with self._cache_lock:
+                self._analysis_cache[cache_key] = copy.deepcopy(analysis)
+                while len(self._analysis_cache) > self.config.ANALYSIS_CACHE_SIZE:
+                    self._analysis_cache.popitem(last=False)
+        return analysis
+    
+    def _analyze_document(self, text: str, filename: str) -> Dict[str, Any]:
+        """Run the full enhanced analysis pipeline"""
         try:
+            # Case-fold once and share across the analysis steps
+            text_lower = text.lower()
+            filename_lower = filename.lower()
+            
+            # Single scan for keywords, dates and numbers
+            scan = self._scan_text(text_lower)
+            
             # Smart document type classification
-            doc_type = self._classify_document_intelligently(text, filename)
+            doc_type = self._classify_document_intelligently(scan["categories"], filename_lower)
             
             # Quality assessment
             quality_score = self._assess_document_quality(text)
             
             # Extract key metadata
-            metadata = self._extract_smart_metadata(text, doc_type)
+            metadata = self._extract_smart_metadata(scan, doc_type)
             
             # Compliance insights
-            insights = self._generate_compliance_insights(text, doc_type)
+            insights = self._generate_compliance_insights(text, text_lower, doc_type)
             
             return {
                 "document_type": doc_type,
-                "confidence": self._calculate_confidence(text, filename, doc_type),
+                "confidence": self._calculate_confidence(text, filename_lower, doc_type),
                 "quality": quality_score,
                 "metadata": metadata,
                 "insights": insights,
@@ -254,60 +411,42 @@ class AgnoDocumentIngestionAgent(Agent if AGNO_AVAILABLE else object):
                 "analysis_method": "fallback"
             }
     
-    def _classify_document_intelligently(self, text: str, filename: str) -> str:
-        """Intelligent document classification"""
-        text_lower = text.lower()
-        filename_lower = filename.lower()
-        
-        # Enhanced classification with content analysis
-        classification_scores = {
-            "commercial_registration": 0,
-            "national_id": 0,
-            "bank_statement": 0,
-            "tax_certificate": 0
-        }
-        
-        # Commercial registration indicators
-        if any(keyword in text_lower for keyword in [
-            "commercial registration", "تجاري", "ministry of commerce", 
-            "registration number", "company name", "business activity"
-        ]):
-            classification_scores["commercial_registration"] += 3
-        
-        if any(keyword in filename_lower for keyword in ["commercial", "registration", "cr"]):
-            classification_scores["commercial_registration"] += 2
-        
-        # National ID indicators
-        if any(keyword in text_lower for keyword in [
-            "national identity", "هوية وطنية", "identity card", "id number"
-        ]):
-            classification_scores["national_id"] += 3
-        
-        if any(keyword in filename_lower for keyword in ["national", "id", "identity"]):
-            classification_scores["national_id"] += 2
-        
-        # Bank statement indicators
-        if any(keyword in text_lower for keyword in [
-            "bank statement", "account number", "balance", "transaction", "sar"
-        ]):
-            classification_scores["bank_statement"] += 3
-        
-        if any(keyword in filename_lower for keyword in ["bank", "statement", "account"]):
-            classification_scores["bank_statement"] += 2
-        
-        # Tax certificate indicators
-        if any(keyword in text_lower for keyword in [
-            "tax certificate", "vat", "ضريبة", "zatca", "tax registration"
-        ]):
-            classification_scores["tax_certificate"] += 3
-        
-        if any(keyword in filename_lower for keyword in ["tax", "vat", "certificate"]):
-            classification_scores["tax_certificate"] += 2
+    def _scan_text(self, text_lower: str) -> Dict[str, Any]:
+        """Collect keyword categories, dates and long numbers in one pass"""
+        categories, dates, numbers = set(), [], []
+        for match in self._TEXT_SCAN_RE.finditer(text_lower):
+            group = match.lastgroup
+            if group == "number":
+                numbers.append(match.group())
+            elif group == "date":
+                if len(dates) < self._META_LIMIT:
+                    dates.append(match.group())
+            else:
+                categories.add(group)
+        return {"categories": categories, "dates": dates, "numbers": numbers}
+    
+    def _classify_document_intelligently(self, content_categories: set, filename_lower: str) -> str:
+        """Intelligent document classification from scanned content categories"""
+        # Enhanced classification with content analysis (+3 content, +2 filename)
+        classification_scores = dict.fromkeys(self._CONTENT_KEYWORDS, 0)
+        for category in content_categories:
+            classification_scores[category] += 3
+        for category in self._matched_categories(self._FILENAME_KEYWORD_RE, filename_lower):
+            classification_scores[category] += 2
         
         # Return the highest scoring classification
         best_match = max(classification_scores.items(), key=lambda x: x[1])
         return best_match[0] if best_match[1] > 0 else "unknown"
     
+    def _matched_categories(self, pattern: "re.Pattern", text: str) -> set:
+        """Categories with at least one keyword in text (stops once all have matched)"""
+        found = set()
+        for match in pattern.finditer(text):
+            found.add(match.lastgroup)
+            if len(found) == len(self._CONTENT_KEYWORDS):
+                break
+        return found
+    
     def _assess_document_quality(self, text: str) -> float:
         """Assess document quality"""
         quality_score = 0.0
@@ -317,49 +456,38 @@ class AgnoDocumentIngestionAgent(Agent if AGNO_AVAILABLE else object):
             quality_score += 0.3
         
         # Content diversity check
-        if len(set(text.split())) / len(text.split()) > 0.5:
+        words = text.split()
+        if words and len(set(words)) / len(words) > 0.5:
             quality_score += 0.3
         
         # Number presence (important for IDs, dates, etc.)
-        if any(char.isdigit() for char in text):
+        if self._DIGIT_RE.search(text):
             quality_score += 0.2
         
         # Special characters (indicates structured content)
-        if any(char in text for char in ['-', '/', ':', '(', ')']):
+        if self._STRUCT_RE.search(text):
             quality_score += 0.2
         
         return min(quality_score, 1.0)
     
-    def _extract_smart_metadata(self, text: str, doc_type: str) -> Dict[str, Any]:
+    def _extract_smart_metadata(self, scan: Dict[str, Any], doc_type: str) -> Dict[str, Any]:
         """Extract intelligent metadata based on document type"""
-        import re
-        
         metadata = {"extraction_method": "smart_regex"}
+        numbers = scan["numbers"]
         
-        # Common patterns
-        date_pattern = r'\d{4}[-/]\d{2}[-/]\d{2}|\d{2}[-/]\d{2}[-/]\d{4}'
-        number_pattern = r'\b\d{10,}\b'
-        
-        dates = re.findall(date_pattern, text)
-        numbers = re.findall(number_pattern, text)
+        metadata["dates_found"] = scan["dates"]
+        metadata["important_numbers"] = numbers[:self._META_LIMIT]
         
-        metadata["dates_found"] = dates[:3]  # Limit to first 3
-        metadata["important_numbers"] = numbers[:3]  # Limit to first 3
-        
-        # Document-specific extraction
+        # Document-specific extraction (standalone 10-digit numbers)
         if doc_type == "commercial_registration":
-            cr_pattern = r'\b\d{10}\b'
-            cr_numbers = re.findall(cr_pattern, text)
-            metadata["cr_candidates"] = cr_numbers
+            metadata["cr_candidates"] = [n for n in numbers if len(n) == 10]
         
         elif doc_type == "national_id":
-            id_pattern = r'\b[12]\d{9}\b'
-            id_numbers = re.findall(id_pattern, text)
-            metadata["id_candidates"] = id_numbers
+            metadata["id_candidates"] = [n for n in numbers if len(n) == 10 and n[0] in "12"]
         
         return metadata
     
-    def _generate_compliance_insights(self, text: str, doc_type: str) -> List[str]:
+    def _generate_compliance_insights(self, text: str, text_lower: str, doc_type: str) -> List[str]:
         """Generate compliance insights"""
         insights = []
         
@@ -369,28 +497,29 @@ class AgnoDocumentIngestionAgent(Agent if AGNO_AVAILABLE else object):
         
         # Document-specific insights
         if doc_type == "commercial_registration":
-            if "saudi" in text.lower() or "المملكة" in text:
+            if "saudi" in text_lower or "المملكة" in text:
                 insights.append("Saudi jurisdiction indicators found")
-            if not any(char.isdigit() for char in text):
+            if not self._DIGIT_RE.search(text):
                 insights.append("No registration numbers detected - document may be incomplete")
         
         elif doc_type == "national_id":
-            if any(ord(char) > 127 for char in text):  # Non-ASCII characters
+            # isascii() is O(1) on CPython; only scan for Arabic when non-ASCII text is present
+            if not text.isascii() and self._ARABIC_RE.search(text):
                 insights.append("Arabic text detected - good for Saudi ID documents")
         
         elif doc_type == "bank_statement":
-            if "sar" in text.lower():
+            if "sar" in text_lower:
                 insights.append("Saudi currency (SAR) detected")
         
         return insights
     
-    def _calculate_confidence(self, text: str, filename: str, doc_type: str) -> float:
+    def _calculate_confidence(self, text: str, filename_lower: str, doc_type: str) -> float:
         """Calculate classification confidence"""
         # Simple confidence calculation based on multiple factors
         confidence = 0.5  # Base confidence
         
         # Filename match increases confidence
-        if doc_type in filename.lower():
+        if doc_type in filename_lower:
             confidence += 0.2
         
         # Content length increases confidence
@@ -398,7 +527,7 @@ class AgnoDocumentIngestionAgent(Agent if AGNO_AVAILABLE else object):
             confidence += 0.2
         
         # Structured content increases confidence
-        if any(pattern in text for pattern in [':', '-', '/', '(', ')']):
+        if self._STRUCT_RE.search(text):
             confidence += 0.1
         
         return min(confidence, 1.0)
@@ -407,27 +536,55 @@ class AgnoDocumentIngestionAgent(Agent if AGNO_AVAILABLE else object):
         """Fallback document type guessing"""
         filename_lower = filename.lower()
         
-        if "commercial" in filename_lower:
-            return "commercial_registration"
-        elif "national" in filename_lower or "id" in filename_lower:
-            return "national_id"
-        elif "bank" in filename_lower:
-            return "bank_statement"
-        elif "tax" in filename_lower or "vat" in filename_lower:
-            return "tax_certificate"
-        else:
-            return "unknown"
+        for keyword, doc_type in self._GUESS_KEYWORDS:
+            if keyword in filename_lower:
+                return doc_type
+        return "unknown"
     
-    def _extract_pdf_text(self, file_content: bytes) -> str:
-        """Extract text from PDF"""
+    def _extract_pdf_text(self, source: str) -> str:
+        """Extract text from a PDF file using PDFium's native text extraction"""
+        pdf = None
         try:
-            pdf_reader = PyPDF2.PdfReader(io.BytesIO(file_content))
-            text = ""
-            for page in pdf_reader.pages:
-                text += page.extract_text() + "\n"
-            return text.strip()
+            pdf = pdfium.PdfDocument(source)
+            page_count = len(pdf)
+            if page_count <= self.config.PDF_PARALLEL_PAGE_THRESHOLD:
+                pages_text = _page_texts(pdf, 0, page_count)
+            else:
+                pdf.close()
+                pdf = None
+                pages_text = self._extract_pages_parallel(source, page_count)
+            # PDFium separates lines with CRLF
+            return "\n".join(pages_text).replace("\r\n", "\n").strip()
         except Exception as e:
             return f"PDF extraction error: {str(e)}"
+        finally:
+            if pdf is not None:
+                pdf.close()
+    
+    def _extract_pages_parallel(self, source: str, page_count: int) -> List[str]:
+        """Split a large PDF into page ranges and extract them across worker processes"""
+        if self._pdf_pool is None:
+            self._pdf_pool = ProcessPoolExecutor(max_workers=self._pdf_workers)
+        
+        chunk_size = max(1, -(-page_count // self._pdf_workers))
+        futures = [
+            self._pdf_pool.submit(_extract_page_range, source, start, min(start + chunk_size, page_count))
+            for start in range(0, page_count, chunk_size)
+        ]
+        return [text for future in futures for text in future.result()]
+    
+    def close(self):
+        """Shut down the worker pools, flush Kafka and close the embedding cache"""
+        self._io_pool.shutdown()
+        self.kafka_handler.flush()
+        if self._pdf_pool is not None:
+            self._pdf_pool.shutdown()
+            self._pdf_pool = None
+        if self._emb_cache is not None:
+            self._emb_cache.close()
+            self._emb_cache = None
+        if self._sessions is not None:
+            self._sessions.remove()  # The engine's pool is process-wide, so it stays open
     
     def _store_in_vector_knowledge(self, result: Dict[str, Any]):
         """Store document in vector knowledge base"""
@@ -440,63 +597,153 @@ class AgnoDocumentIngestionAgent(Agent if AGNO_AVAILABLE else object):
             
             # Chunk text for better retrieval
             chunks = self._chunk_text(text)
+            analysis = result.get("enhanced_analysis", {})
+            embeddings = self._embed_chunks(chunks)
             
-            for i, chunk in enumerate(chunks):
-                chunk_id = f"{doc_id}_chunk_{i}"
-                self.knowledge.upsert([{
-                    "id": chunk_id,
+            # One batched upsert so the store can embed and write all chunks together
+            self.knowledge.upsert([
+                {
+                    "id": f"{doc_id}_chunk_{i}",
                     "text": chunk,
+                    **({"embedding": embeddings[i]} if embeddings else {}),
                     "metadata": {
                         "document_id": doc_id,
                         "filename": result["filename"],
                         "customer_id": result["customer_id"],
                         "chunk_index": i,
                         "total_chunks": len(chunks),
-                        "document_type": result.get("enhanced_analysis", {}).get("document_type", "unknown"),
-                        "quality_score": result.get("enhanced_analysis", {}).get("quality", 0.5),
+                        "document_type": analysis.get("document_type", "unknown"),
+                        "quality_score": analysis.get("quality", 0.5),
                         "processed_at": result["processed_at"]
                     }
-                }])
+                }
+                for i, chunk in enumerate(chunks)
+            ])
             
         except Exception as e:
             logger.error(f"Vector storage error: {e}")
     
+    def _embed_chunks(self, chunks: List[str]) -> Optional[List[List[float]]]:
+        """Embed chunks via the on-disk cache (None if the knowledge base has no embedder)"""
+        embedder = getattr(self.knowledge, "embedder", None)
+        if embedder is None:
+            return None
+        
+        # Look up every chunk by content hash (batched to stay under SQLite's parameter limit)
+        hashes = [hashlib.blake2b(chunk.encode(), digest_size=16).digest() for chunk in chunks]
+        cached = {}
+        with self._cache_lock:
+            if self._emb_cache is None:
+                os.makedirs(self.config.CHROMA_DB_PATH, exist_ok=True)
+                # Upserts run on the I/O pool, so the connection is shared across its threads
+                self._emb_cache = sqlite3.connect(
+                    os.path.join(self.config.CHROMA_DB_PATH, "emb_cache.sqlite"), check_same_thread=False
+                )
+                self._emb_cache.execute("CREATE TABLE IF NOT EXISTS emb_cache (hash BLOB PRIMARY KEY, vec BLOB)")
+            
+            for start in range(0, len(hashes), 500):
+                batch = hashes[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                cached.update(self._emb_cache.execute(
+                    f"SELECT hash, vec FROM emb_cache WHERE hash IN ({placeholders})", batch
+                ))
+        
+        # Embed only the misses (each distinct chunk once), in one batch call
+        pending = {chunk_hash: chunk for chunk_hash, chunk in zip(hashes, chunks) if chunk_hash not in cached}
+        if pending:
+            vectors = self._embed_batch(embedder, list(pending.values()))
+            misses = [(chunk_hash, array('f', vector).tobytes()) for chunk_hash, vector in zip(pending, vectors)]
+            cached.update(misses)
+            with self._cache_lock, self._emb_cache:
+                self._emb_cache.executemany("INSERT OR REPLACE INTO emb_cache VALUES (?, ?)", misses)
+        
+        return [array('f', cached[chunk_hash]).tolist() for chunk_hash in hashes]
+    
+    @staticmethod
+    def _embed_batch(embedder, chunks: List[str]) -> List[List[float]]:
+        """Embed several chunks, in one request when the embedder has a batch API"""
+        for method in EMBEDDER_BATCH_METHODS:
+            embed_many = getattr(embedder, method, None)
+            if embed_many is not None:
+                return embed_many(chunks)
+        return [embedder.get_embedding(chunk) for chunk in chunks]
+    
     def _chunk_text(self, text: str, chunk_size: int = 1000, overlap: int = 200) -> List[str]:
         """Split text into overlapping chunks"""
         if len(text) <= chunk_size:
             return [text]
         
-        chunks = []
-        start = 0
-        while start < len(text):
-            end = start + chunk_size
-            chunk = text[start:end]
-            chunks.append(chunk)
-            start = end - overlap
+        return [text[start:start + chunk_size] for start in range(0, len(text), chunk_size - overlap)]
+    
+    def _find_existing_document(self, doc_id: str) -> Optional[Dict[str, Any]]:
+        """Look up a previously processed document by its content-addressed ID"""
+        if not self.use_database:
+            return self.memory_storage.get(doc_id)
         
-        return chunks
+        try:
+            session = self._sessions()
+            try:
+                document = session.get(Document, doc_id)
+                if document is None:
+                    return None
+                return {
+                    "status": "success",
+                    "document_id": document.id,
+                    "filename": document.filename,
+                    "file_type": document.file_type,
+                    "customer_id": document.customer_id,
+                    "extracted_text": document.extracted_text,
+                    "text_length": document.text_length,
+                    "processed_at": document.upload_time.isoformat() if document.upload_time else None
+                }
+            finally:
+                self._sessions.remove()
+        except Exception as e:
+            logger.error(f"Database lookup error: {e}")
+            return None
     
     def _store_in_database(self, doc_data: Dict[str, Any]):
         """Store document in database"""
+        self._store_in_database_many([doc_data])
+    
+    def _store_in_database_many(self, results: List[Dict[str, Any]]):
+        """Store several documents in one transaction"""
+        if not results:
+            return
+        
         try:
-            session = get_database_session()
-            
-            document = Document(
-                id=doc_data['document_id'],
-                filename=doc_data['filename'],
-                file_type=doc_data['file_type'],
-                customer_id=doc_data['customer_id'],
-                extracted_text=doc_data['extracted_text'],
-                text_length=doc_data['text_length'],
-                processed=True,
-                processing_status='completed'
-            )
-            
-            session.add(document)
-            session.commit()
-            session.close()
+            session = self._sessions()
+            try:
+                documents = [
+                    Document(
+                        id=doc_data['document_id'],
+                        filename=doc_data['filename'],
+                        file_type=doc_data['file_type'],
+                        customer_id=doc_data['customer_id'],
+                        extracted_text=doc_data['extracted_text'],
+                        text_length=doc_data['text_length'],
+                        processed=True,
+                        processing_status='completed'
+                    )
+                    for doc_data in results
+                ]
+                if self.config.DEDUPLICATE_DOCUMENTS:
+                    session.bulk_save_objects(documents)
+                else:
+                    # Re-ingesting known content: overwrite the existing rows
+                    for document in documents:
+                        session.merge(document)
+                session.commit()
+            except Exception:
+                session.rollback()
+                raise
+            finally:
+                self._sessions.remove()
             
-            print(f"   💾 Document stored in database")
+            if len(results) == 1:
+                print(f"   💾 Document stored in database")
+            else:
+                print(f"   💾 {len(results)} documents stored in database")
             
         except Exception as e:
             logger.error(f"Database storage error: {e}")
@@ -523,6 +770,21 @@ class AgnoDocumentIngestionAgent(Agent if AGNO_AVAILABLE else object):
             }
         )
     
+    def _emit_deduplicated_event(self, result: Dict[str, Any]):
+        """Emit a lightweight event for a re-upload of an already processed document"""
+        doc_id = result["document_id"]
+        self.kafka_handler.send_event(
+            topic="document-deduplicated",
+            key=doc_id,
+            value={
+                "document_id": doc_id,
+                "filename": result["filename"],
+                "customer_id": result["customer_id"],
+                "original_processed_at": result["processed_at"],
+                "deduplicated_at": datetime.now().isoformat()
+            }
+        )
+    
     def query_knowledge_base(self, query: str, limit: int = 3) -> List[Dict]:
         """Query the vector knowledge base"""
         if not self.knowledge:
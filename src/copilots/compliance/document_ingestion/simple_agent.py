@@ -1,49 +1,104 @@
 # src/copilots/compliance/document_ingestion/simple_agent.py
+import asyncio
+import functools
 import hashlib
 import io
 import os
+import re
+import subprocess
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Tuple
 import PyPDF2
 import logging
 from pathlib import Path
+from sqlalchemy import insert, select
 
+# PyMuPDF (MuPDF C engine) is preferred for PDF text; PyPDF2 remains the fallback
 try:
-    from ..shared.kafka_handler import KafkaHandler
+    import pymupdf
+    PYMUPDF_AVAILABLE = True
 except ImportError:
-    # Fallback for when running directly
-    import sys
-    import os
-    sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
-    from copilots.compliance.shared.kafka_handler import KafkaHandler
+    PYMUPDF_AVAILABLE = False
 
-# Import our models and config
-import sys
-sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+# OCR for image documents (needs the tesseract binary with eng+ara language data)
+try:
+    from PIL import Image
+    import pytesseract
+    OCR_AVAILABLE = True
+except ImportError:
+    OCR_AVAILABLE = False
 
-from copilots.compliance.shared.models import Document, get_database_session, create_tables, test_database_connection
-from copilots.compliance.config import Config
+OCR_LANG = "eng+ara"
+OCR_CONFIG = "--psm 6"  # Treat each image as one uniform block of text
 
-# Set up logging
-logging.basicConfig(level=logging.INFO)
+# Import Kafka, our models and config
+# (run as: python -m copilots.compliance.document_ingestion.simple_agent, from src/)
+from ..shared.kafka_handler import KafkaHandler
+from ..shared.models import Document, get_database_session, create_tables, test_database_connection
+from ..config import get_config
+
+# Logging handlers and levels are left to the application (per-step/per-page detail is logged at DEBUG)
 logger = logging.getLogger(__name__)
 
+# Filename keywords for document type guessing (lookahead so overlapping keywords all match)
+_DOCTYPE_RE = re.compile(r"(?=(commercial|registration|national|id|bank|tax))")
+_DOCTYPE_MAP = {
+    "commercial": "commercial_registration",
+    "registration": "commercial_registration",
+    "national": "national_id",
+    "id": "national_id",
+    "bank": "bank_statement",
+    "tax": "tax_certificate"
+}
+_DOCTYPE_PRIORITY = ("commercial_registration", "national_id", "bank_statement", "tax_certificate")
+_DOCTYPE_RANK = {keyword: _DOCTYPE_PRIORITY.index(doc_type) for keyword, doc_type in _DOCTYPE_MAP.items()}
+
+# File signatures checked before dispatching on the (possibly wrong) extension
+_MAGIC_TYPES = ((b'%PDF', '.pdf'), (b'\xff\xd8\xff', '.jpg'), (b'\x89PNG', '.png'))
+
+@functools.cache
+def _get_kafka_handler() -> KafkaHandler:
+    """Process-wide Kafka handler (one producer shared by all agents)"""
+    return KafkaHandler()
+
+@functools.cache
+def _database_ready() -> bool:
+    """Probe the database and create tables once per process"""
+    print("🔍 Testing database connection...")
+    if test_database_connection():
+        print("🏗️  Creating database tables...")
+        create_tables()
+        return True
+    return False
+
+def _extract_page_range(file_path: str, start: int, end: int) -> List[str]:
+    """Process-pool worker: open its own PyMuPDF document and extract pages [start, end)"""
+    with pymupdf.open(file_path) as doc:
+        return [doc[page_num].get_text("text") for page_num in range(start, end)]
+
 class SimpleDocumentIngestionAgent:
     """
     Simple Document Ingestion Agent
     Processes uploaded documents and stores them in the database
     """
     
+    _pdf_pool = None  # Shared ProcessPoolExecutor, created on the first large PDF
+    _pdf_workers = 1  # Worker count the pool was created with
+    
     def __init__(self):
-        self.config = Config()
-        self.kafka_handler = KafkaHandler()
-        print("🔍 Testing database connection...")
+        self.config = get_config()
+        self.kafka_handler = _get_kafka_handler()
         
-        # Test database connection
-        print("🔍 Testing database connection...")
-        if test_database_connection():
-            print("🏗️  Creating database tables...")
-            create_tables()
+        # Most recently processed/read documents, so get_document() right after processing skips the database
+        self._recent: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._recent_lock = threading.Lock()
+        
+        # Test database connection (cached after the first agent)
+        if _database_ready():
             self.use_database = True
             print("✅ Database ready!")
         else:
@@ -62,233 +117,437 @@ class SimpleDocumentIngestionAgent:
         Returns:
             Dictionary with processing results
         """
-        try:
-            print(f"📄 Processing document: {file_path}")
-            
-            # Validate file exists
-            if not os.path.exists(file_path):
-                raise FileNotFoundError(f"File not found: {file_path}")
-            
-            # Get file info
-            filename = os.path.basename(file_path)
-            file_size = os.path.getsize(file_path)
-            file_ext = Path(file_path).suffix.lower()
-            
-            print(f"   📊 File info: {filename} ({file_size} bytes, {file_ext})")
-            
-            # Check file size
-            if file_size > self.config.MAX_FILE_SIZE:
-                raise ValueError(f"File too large: {file_size} bytes (max: {self.config.MAX_FILE_SIZE})")
-            
-            # Check file extension
-            if file_ext not in self.config.ALLOWED_EXTENSIONS:
-                raise ValueError(f"File type not supported: {file_ext}")
-            
-            # Generate document ID
-            doc_id = self._generate_document_id(file_path, customer_id)
-            print(f"   🔑 Generated ID: {doc_id}")
-            
-            # Read file content
-            with open(file_path, 'rb') as file:
-                file_content = file.read()
+        return self.process_documents([file_path], customer_id)[0]
+    
+    async def process_document_async(self, file_path: str, customer_id: str = None) -> Dict[str, Any]:
+        """Async variant: run the blocking pipeline in a worker thread so the event loop stays free"""
+        return await asyncio.to_thread(self.process_document, file_path, customer_id)
+    
+    async def process_documents_async(self, file_paths: List[str], customer_id: str = None) -> List[Dict[str, Any]]:
+        """Process several documents concurrently (results in input order)"""
+        return await asyncio.gather(*(
+            self.process_document_async(file_path, customer_id) for file_path in file_paths
+        ))
+    
+    def process_documents(self, file_paths: List[str], customer_id: str = None) -> List[Dict[str, Any]]:
+        """
+        Process several document files, storing them in a single database transaction
+        
+        Args:
+            file_paths: Paths to the document files
+            customer_id: Optional customer ID
             
-            # Extract text
-            print(f"   📝 Extracting text from {file_ext} file...")
-            extracted_text = self._extract_text(file_content, file_ext)
-            print(f"   ✅ Extracted {len(extracted_text)} characters")
+        Returns:
+            One result dictionary per path, in input order
+        """
+        results: List[Optional[Dict[str, Any]]] = [None] * len(file_paths)
+        ingested = []  # (index, doc_data) for files that were read and extracted
+        pending_ids = set()  # IDs extracted in this batch, so repeats within it are duplicates too
+        
+        # One timestamp per request, so its records, events and results all agree
+        now = datetime.now()
+        now_iso = now.isoformat()
+        
+        for index, file_path in enumerate(file_paths):
+            try:
+                doc_data = self._ingest_file(file_path, customer_id, now, pending_ids)
+            except Exception as e:
+                results[index] = self._error_result(file_path, e, now_iso)
+                continue
             
-            # Create document record
-            doc_data = {
+            if doc_data['processing_status'] == 'duplicate':
+                results[index] = self._duplicate_result(doc_data, now_iso)
+            else:
+                pending_ids.add(doc_data['id'])
+                ingested.append((index, doc_data))
+        
+        if not ingested:
+            return results
+        
+        self._ocr_pending_images(ingested, file_paths)
+        
+        # Store in database or memory
+        rows = [doc_data for _, doc_data in ingested]
+        try:
+            if self.use_database:
+                logger.debug("Storing in database...")
+                self._store_many_in_database(rows)
+                for doc_data in rows:
+                    self._remember_document(self._document_view(doc_data))
+            else:
+                logger.debug("Storing in memory...")
+                for doc_data in rows:
+                    self.memory_storage[doc_data['id']] = doc_data
+        except Exception as e:
+            for index, _ in ingested:
+                results[index] = self._error_result(file_paths[index], e, now_iso)
+            return results
+        
+        for index, doc_data in ingested:
+            results[index] = self._publish_document(doc_data, now_iso)
+        return results
+    
+    def _ingest_file(self, file_path: str, customer_id: str, now: datetime, pending_ids=()) -> Dict[str, Any]:
+        """Validate a file and extract its text into a document record (or a duplicate marker)"""
+        logger.debug("Processing document: %s", file_path)
+        
+        # Validate file exists and get its size (one stat call)
+        try:
+            file_size = os.stat(file_path).st_size
+        except FileNotFoundError:
+            raise FileNotFoundError(f"File not found: {file_path}") from None
+        
+        # Get file info (string-only, same rules as Path.suffix)
+        filename = os.path.basename(file_path)
+        stem, _, ext = filename.rpartition('.')
+        file_ext = f".{ext.lower()}" if stem and ext else ''
+        
+        logger.debug("File info: %s (%d bytes, %s)", filename, file_size, file_ext)
+        
+        # Check file size
+        if file_size > self.config.MAX_FILE_SIZE:
+            raise ValueError(f"File too large: {file_size} bytes (max: {self.config.MAX_FILE_SIZE})")
+        
+        # Check file extension
+        if file_ext not in self.config.ALLOWED_EXTENSIONS:
+            raise ValueError(f"File type not supported: {file_ext}")
+        
+        # Generate content-addressed document ID
+        doc_id = self._generate_document_id(file_path, customer_id)
+        logger.debug("Generated ID: %s", doc_id)
+        
+        # Same content for the same customer was already ingested: skip extraction, storage and events
+        existing = None if doc_id in pending_ids else self._find_existing_document(doc_id)
+        if doc_id in pending_ids or existing:
+            logger.debug("Duplicate content, skipping extraction: %s", doc_id)
+            return {
                 'id': doc_id,
                 'filename': filename,
                 'file_type': file_ext.replace('.', ''),
                 'customer_id': customer_id,
-                'extracted_text': extracted_text,
-                'text_length': len(extracted_text),
-                'processed': True,
-                'processing_status': 'completed',
-                'upload_time': datetime.now()
+                'text_length': existing['text_length'] if existing else None,
+                'processing_status': 'duplicate'
             }
-            
-            # Store in database or memory
-            if self.use_database:
-                print(f"   💾 Storing in database...")
-                self._store_in_database(doc_data)
-            else:
-                print(f"   💭 Storing in memory...")
-                self.memory_storage[doc_id] = doc_data
-            
-            # Log success
-            logger.info(f"✅ Successfully processed: {filename} (ID: {doc_id})")
-            
-            # Emit Kafka events
-            print("📤 Emitting Kafka events...")
-            self.kafka_handler.send_event(
-                topic="document-processed",
-                key=doc_id,
-                value={
-                    "document_id": doc_id,
-                    "filename": filename,
-                    "customer_id": customer_id,
-                    "processed_at": doc_data['upload_time'].isoformat(),
-                    "text_length": len(extracted_text),
-                    "status": "success"
-                }
-            )
+        
+        # Extract text (parsers read from the path; PDFs are never copied into memory whole)
+        content_type = self._sniff_content_type(file_path, file_ext)
+        if OCR_AVAILABLE and content_type in ['.jpg', '.jpeg', '.png']:
+            extracted_text = None  # OCR'd with the rest of the batch's images in one tesseract run
+        else:
+            logger.debug("Extracting text from %s file...", content_type)
+            extracted_text = self._extract_text(file_path, content_type)
+            logger.debug("Extracted %d characters", len(extracted_text))
+        
+        # Create document record
+        return {
+            'id': doc_id,
+            'filename': filename,
+            'file_type': file_ext.replace('.', ''),
+            'content_type': content_type,  # Sniffed type, used again by deferred OCR
+            'customer_id': customer_id,
+            'extracted_text': extracted_text,
+            'text_length': len(extracted_text) if extracted_text is not None else None,
+            'processed': True,
+            'processing_status': 'completed',
+            'upload_time': now
+        }
+    
+    def _publish_document(self, doc_data: Dict[str, Any], now_iso: str) -> Dict[str, Any]:
+        """Emit Kafka events for a stored document and build its success result"""
+        doc_id = doc_data['id']
+        filename = doc_data['filename']
+        customer_id = doc_data['customer_id']
+        document_type = self._guess_document_type(filename)
+        
+        # Emit Kafka events
+        logger.debug("Emitting Kafka events...")
+        self.kafka_handler.send_event(
+            topic="document-processed",
+            key=doc_id,
+            value={
+                "document_id": doc_id,
+                "filename": filename,
+                "customer_id": customer_id,
+                "processed_at": now_iso,
+                "text_length": doc_data['text_length'],
+                "status": "success"
+            }
+        )
 
-            # Emit event for KYC validation queue
-            self.kafka_handler.send_event(
-                topic="kyc-validation-requested", 
-                key=doc_id,
-                value={
-                    "document_id": doc_id,
-                    "customer_id": customer_id,
-                    "filename": filename,
-                    "document_type": self._guess_document_type(filename),
-                    "requested_at": datetime.now().isoformat()
-                }
-            )
+        # Emit event for KYC validation queue
+        self.kafka_handler.send_event(
+            topic="kyc-validation-requested", 
+            key=doc_id,
+            value={
+                "document_id": doc_id,
+                "customer_id": customer_id,
+                "filename": filename,
+                "document_type": document_type,
+                "requested_at": now_iso
+            }
+        )
 
-            # Log success
-            logger.info(f"✅ Successfully processed: {filename} (ID: {doc_id})")
+        # Log success
+        logger.info("✅ Successfully processed: %s (ID: %s)", filename, doc_id)
 
-            return {
-                'status': 'success',
-                'document_id': doc_id,
-                'filename': filename,
-                'file_type': doc_data['file_type'],
-                'text_length': len(extracted_text),
-                'customer_id': customer_id,
-                'processed_at': doc_data['upload_time'].isoformat(),
-                'message': 'Document processed successfully'
-            }
-            
-        except Exception as e:
-            error_msg = f"Error processing {file_path}: {str(e)}"
-            logger.error(error_msg)
-            print(f"   ❌ {error_msg}")
-            
-            return {
-                'status': 'error',
-                'filename': os.path.basename(file_path) if os.path.exists(file_path) else 'unknown',
-                'error': str(e),
-                'processed_at': datetime.now().isoformat()
-            }
+        return {
+            'status': 'success',
+            'document_id': doc_id,
+            'filename': filename,
+            'file_type': doc_data['file_type'],
+            'text_length': doc_data['text_length'],
+            'extracted_text': doc_data['extracted_text'],  # Callers validate it without a get_document() round trip
+            'document_type': document_type,
+            'customer_id': customer_id,
+            'processed_at': now_iso,
+            'message': 'Document processed successfully'
+        }
+    
+    def _duplicate_result(self, doc_data: Dict[str, Any], now_iso: str) -> Dict[str, Any]:
+        """Build the result for a document whose content was already ingested"""
+        logger.info("♻️  Already processed: %s (ID: %s)", doc_data['filename'], doc_data['id'])
+        
+        return {
+            'status': 'duplicate',
+            'document_id': doc_data['id'],
+            'filename': doc_data['filename'],
+            'file_type': doc_data['file_type'],
+            'text_length': doc_data['text_length'],
+            'document_type': self._guess_document_type(doc_data['filename']),
+            'customer_id': doc_data['customer_id'],
+            'processed_at': now_iso,
+            'message': 'Document already processed'
+        }
+    
+    def _error_result(self, file_path: str, error: Exception, now_iso: str) -> Dict[str, Any]:
+        """Log a processing failure and build its error result"""
+        logger.error("Error processing %s: %s", file_path, error)
+        
+        return {
+            'status': 'error',
+            'filename': os.path.basename(file_path) if os.path.exists(file_path) else 'unknown',
+            'error': str(error),
+            'processed_at': now_iso
+        }
     
     def _generate_document_id(self, file_path: str, customer_id: str = None) -> str:
-        """Generate unique document ID"""
-        content = f"{file_path}_{customer_id}_{datetime.now().isoformat()}"
-        return hashlib.md5(content.encode()).hexdigest()
+        """Generate a document ID from the file content (128-bit BLAKE2b keyed by customer)"""
+        key = hashlib.blake2b(customer_id.encode()).digest() if customer_id else b''
+        with open(file_path, 'rb') as file:
+            digest = hashlib.file_digest(file, lambda: hashlib.blake2b(digest_size=16, key=key))
+        return digest.hexdigest()
     
-    def _extract_text(self, file_content: bytes, file_ext: str) -> str:
+    def _find_existing_document(self, doc_id: str) -> Optional[Dict[str, Any]]:
+        """Primary-key lookup of an already ingested document (no text is loaded)"""
+        if not self.use_database:
+            doc = self.memory_storage.get(doc_id)
+            return {'text_length': doc['text_length']} if doc else None
+        
+        with get_database_session() as session:
+            row = session.execute(
+                select(Document.text_length).where(Document.id == doc_id)
+            ).first()
+        return {'text_length': row.text_length} if row else None
+    
+    def _sniff_content_type(self, file_path: str, file_ext: str) -> str:
+        """Detect PDF/JPEG/PNG content from its first bytes, else trust the extension"""
+        with open(file_path, 'rb') as file:
+            head = file.read(8)
+        for magic, content_type in _MAGIC_TYPES:
+            if head.startswith(magic):
+                if content_type != file_ext:
+                    logger.debug("%s content has a %s extension", content_type, file_ext)
+                return content_type
+        return file_ext
+    
+    def _extract_text(self, file_path: str, file_ext: str) -> str:
         """Extract text from file based on extension"""
         try:
             if file_ext == '.pdf':
-                return self._extract_pdf_text(file_content)
+                return self._extract_pdf_text(file_path)
             elif file_ext == '.txt':
-                return file_content.decode('utf-8')
+                # Invalid bytes become U+FFFD instead of failing the whole document
+                with open(file_path, encoding='utf-8', errors='replace', newline='') as file:
+                    return file.read()
             elif file_ext in ['.jpg', '.jpeg', '.png']:
-                return self._extract_image_text(file_content)
+                return self._extract_image_text(Path(file_path).read_bytes())
             else:
                 return f"Text extraction not implemented for {file_ext}"
         except Exception as e:
             return f"Text extraction failed: {str(e)}"
     
-    def _extract_pdf_text(self, file_content: bytes) -> str:
-        """Extract text from PDF file"""
+    def _extract_pdf_text(self, file_path: str) -> str:
+        """Extract text from PDF file (PyMuPDF, falling back to PyPDF2)"""
+        if PYMUPDF_AVAILABLE:
+            try:
+                # Opening by path lets MuPDF read pages on demand instead of holding a bytes copy
+                with pymupdf.open(file_path) as doc:
+                    if doc.page_count > self.config.PDF_PARALLEL_PAGE_THRESHOLD:
+                        pages_text = self._extract_pages_parallel(file_path, doc.page_count)
+                    else:
+                        pages_text = []
+                        for page_num, page in enumerate(doc):
+                            page_text = page.get_text("text")
+                            pages_text.append(page_text)
+                            logger.debug("Page %d: %d characters", page_num + 1, len(page_text))
+                return "\n".join(pages_text).strip()
+            except Exception as e:
+                logger.warning("PyMuPDF extraction failed, falling back to PyPDF2: %s", e)
+        
+        return self._extract_pdf_text_pypdf2(file_path)
+    
+    def _extract_pages_parallel(self, file_path: str, page_count: int) -> List[str]:
+        """Extract a large PDF's pages across worker processes, in page order"""
+        cls = type(self)
+        if cls._pdf_pool is None:
+            cls._pdf_workers = min(os.cpu_count() or 1, self.config.PDF_MAX_WORKERS)
+            cls._pdf_pool = ProcessPoolExecutor(max_workers=cls._pdf_workers)
+        
+        # One contiguous page range per worker keeps IPC to a few messages
+        chunk_size = -(-page_count // cls._pdf_workers)
+        starts = range(0, page_count, chunk_size)
+        ranges = cls._pdf_pool.map(
+            _extract_page_range,
+            [file_path] * len(starts), starts, [min(start + chunk_size, page_count) for start in starts]
+        )
+        return [page_text for page_range in ranges for page_text in page_range]
+    
+    def _extract_pdf_text_pypdf2(self, file_path: str) -> str:
+        """Extract text from PDF file with PyPDF2"""
         try:
-            pdf_reader = PyPDF2.PdfReader(io.BytesIO(file_content))
-            text = ""
+            pdf_reader = PyPDF2.PdfReader(file_path)
+            parts = []
             for page_num, page in enumerate(pdf_reader.pages):
                 try:
-                    page_text = page.extract_text()
-                    text += page_text + "\n"
-                    print(f"     📄 Page {page_num + 1}: {len(page_text)} characters")
+                    page_text = page.extract_text() or ""
+                    parts.append(page_text)
+                    logger.debug("Page %d: %d characters", page_num + 1, len(page_text))
                 except Exception as e:
-                    error_text = f"[Error extracting page {page_num + 1}: {e}]\n"
-                    text += error_text
-                    print(f"     ⚠️  Page {page_num + 1}: Error - {e}")
-            return text.strip()
+                    parts.append(f"[Error extracting page {page_num + 1}: {e}]")
+                    logger.warning("Page %d: Error - %s", page_num + 1, e)
+            return "\n".join(parts).strip()
         except Exception as e:
             return f"PDF extraction error: {str(e)}"
     
     def _extract_image_text(self, file_content: bytes) -> str:
-        """Extract text from image using OCR (placeholder)"""
-        # For now, return placeholder
-        # Later we'll add pytesseract OCR
-        return f"OCR text extraction not yet implemented. File size: {len(file_content)} bytes. Please install pytesseract for image processing."
-    def _guess_document_type(self, filename: str) -> str:
-        """Guess document type from filename"""
-        filename_lower = filename.lower()
+        """Extract text from image using OCR"""
+        if not OCR_AVAILABLE:
+            return f"OCR text extraction not yet implemented. File size: {len(file_content)} bytes. Please install pytesseract for image processing."
         
-        if "commercial" in filename_lower or "registration" in filename_lower:
-            return "commercial_registration"
-        elif "national" in filename_lower or "id" in filename_lower:
-            return "national_id" 
-        elif "bank" in filename_lower:
-            return "bank_statement"
-        elif "tax" in filename_lower:
-            return "tax_certificate"
-        else:
-            return "unknown"
+        with Image.open(io.BytesIO(file_content)) as image:
+            return pytesseract.image_to_string(image, lang=OCR_LANG, config=OCR_CONFIG).strip()
+    
+    def _ocr_pending_images(self, ingested: List[tuple], file_paths: List[str]):
+        """Fill in the text of image documents whose OCR was deferred to the batch"""
+        pending = [(index, doc_data) for index, doc_data in ingested if doc_data['extracted_text'] is None]
+        if not pending:
+            return
+        
+        logger.debug("Running OCR on %d image(s)...", len(pending))
+        texts = self._extract_images_batch([(file_paths[index], doc_data['content_type']) for index, doc_data in pending])
+        for (_, doc_data), text in zip(pending, texts):
+            doc_data['extracted_text'] = text
+            doc_data['text_length'] = len(text)
+    
+    def _extract_images_batch(self, images: List[Tuple[str, str]]) -> List[str]:
+        """OCR several (path, sniffed content type) images with a single tesseract process (one output page per image)"""
+        if len(images) == 1:
+            return [self._extract_text(*images[0])]
+        image_paths = [path for path, _ in images]
+        
+        try:
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                list_path = os.path.join(tmp_dir, "images.txt")
+                with open(list_path, 'w', encoding='utf-8') as list_file:
+                    list_file.writelines(f"{os.path.abspath(path)}\n" for path in image_paths)
+                
+                completed = subprocess.run(
+                    [pytesseract.pytesseract.tesseract_cmd, list_path, "stdout", "-l", OCR_LANG, *OCR_CONFIG.split()],
+                    capture_output=True, check=True
+                )
+            
+            # Tesseract ends every page with a form feed
+            pages = completed.stdout.decode('utf-8', 'replace').split("\f")[:len(image_paths)]
+            if len(pages) == len(image_paths):
+                return [page.strip() for page in pages]
+            logger.warning("Tesseract returned %d page(s) for %d image(s), retrying one by one", len(pages), len(image_paths))
+        except Exception as e:
+            logger.warning("Batch OCR failed, retrying one by one: %s", e)
+        
+        return [self._extract_text(path, content_type) for path, content_type in images]
+    
+    def _guess_document_type(self, filename: str) -> str:
+        """Guess document type from filename (one scan, highest-priority keyword wins)"""
+        ranks = [_DOCTYPE_RANK[keyword] for keyword in _DOCTYPE_RE.findall(filename.lower())]
+        return _DOCTYPE_PRIORITY[min(ranks)] if ranks else "unknown"
 
     def _store_in_database(self, doc_data: Dict[str, Any]):
         """Store document data in PostgreSQL database"""
+        self._store_many_in_database([doc_data])
+    
+    def _store_many_in_database(self, rows: List[Dict[str, Any]], chunk_size: int = 1000):
+        """Insert document rows in one transaction (executemany in bounded chunks)"""
+        columns = ('id', 'filename', 'file_type', 'customer_id', 'extracted_text',
+                   'text_length', 'processed', 'processing_status', 'upload_time')
         try:
-            session = get_database_session()
-            
-            # Create Document object
-            document = Document(
-                id=doc_data['id'],
-                filename=doc_data['filename'],
-                file_type=doc_data['file_type'],
-                customer_id=doc_data['customer_id'],
-                extracted_text=doc_data['extracted_text'],
-                text_length=doc_data['text_length'],
-                processed=doc_data['processed'],
-                processing_status=doc_data['processing_status']
-            )
+            with get_database_session() as session:
+                for start in range(0, len(rows), chunk_size):
+                    session.execute(
+                        insert(Document),
+                        [{column: row[column] for column in columns} for row in rows[start:start + chunk_size]]
+                    )
+                session.commit()
             
-            # Add to session and commit
-            session.add(document)
-            session.commit()
-            session.close()
-            
-            logger.info(f"💾 Document stored in database: {doc_data['id']}")
-            print(f"     ✅ Stored in PostgreSQL")
+            logger.debug("%d document(s) stored in PostgreSQL", len(rows))
             
         except Exception as e:
-            logger.error(f"Database storage error: {e}")
-            print(f"     ❌ Database error: {e}")
+            logger.error("Database storage error: %s", e)
             raise
-    def _guess_document_type(self, filename: str) -> str:
-        """Guess document type from filename"""
-        filename_lower = filename.lower()
-        
-        if "commercial" in filename_lower or "registration" in filename_lower:
-            return "commercial_registration"
-        elif "national" in filename_lower or "id" in filename_lower:
-            return "national_id" 
-        elif "bank" in filename_lower:
-            return "bank_statement"
-        elif "tax" in filename_lower:
-            return "tax_certificate"
-        else:
-            return "unknown"
 
     def get_document(self, doc_id: str) -> Optional[Dict[str, Any]]:
         """Retrieve document by ID"""
         if self.use_database:
-            return self._get_from_database(doc_id)
+            with self._recent_lock:
+                document = self._recent.get(doc_id)
+                if document is not None:
+                    self._recent.move_to_end(doc_id)
+                    return dict(document)
+            
+            document = self._get_from_database(doc_id)
+            if document:
+                self._remember_document(document)
+            return document
         else:
             return self.memory_storage.get(doc_id)
     
+    def _remember_document(self, document: Dict[str, Any]):
+        """Keep a copy in the small LRU of recent documents"""
+        with self._recent_lock:
+            self._recent[document['id']] = dict(document)
+            self._recent.move_to_end(document['id'])
+            while len(self._recent) > self.config.RECENT_DOCUMENTS_CACHE_SIZE:
+                self._recent.popitem(last=False)
+    
+    @staticmethod
+    def _document_view(doc_data: Dict[str, Any]) -> Dict[str, Any]:
+        """A stored record in the shape _get_from_database() returns"""
+        return {
+            'id': doc_data['id'],
+            'filename': doc_data['filename'],
+            'file_type': doc_data['file_type'],
+            'customer_id': doc_data['customer_id'],
+            'extracted_text': doc_data['extracted_text'],
+            'text_length': doc_data['text_length'],
+            'processed': doc_data['processed'],
+            'processing_status': doc_data['processing_status'],
+            'upload_time': doc_data['upload_time'].isoformat()
+        }
+    
     def _get_from_database(self, doc_id: str) -> Optional[Dict[str, Any]]:
         """Get document from database"""
         try:
-            session = get_database_session()
-            document = session.query(Document).filter(Document.id == doc_id).first()
-            session.close()
+            with get_database_session() as session:
+                document = session.query(Document).filter(Document.id == doc_id).first()
             
             if document:
                 return {
@@ -305,33 +564,39 @@ class SimpleDocumentIngestionAgent:
             return None
             
         except Exception as e:
-            logger.error(f"Database retrieval error: {e}")
+            logger.error("Database retrieval error: %s", e)
             return None
     
-    def list_documents(self, customer_id: str = None) -> Dict[str, Any]:
-        """List all documents, optionally filtered by customer"""
+    def list_documents(self, customer_id: str = None, limit: int = 100, offset: int = 0) -> Dict[str, Any]:
+        """List documents newest first, one page at a time, optionally filtered by customer"""
         if self.use_database:
-            return self._list_from_database(customer_id)
+            return self._list_from_database(customer_id, limit, offset)
         else:
-            docs = list(self.memory_storage.values())
+            docs = list(reversed(self.memory_storage.values()))
             if customer_id:
                 docs = [doc for doc in docs if doc.get('customer_id') == customer_id]
             return {
                 'total_documents': len(docs),
-                'documents': docs
+                'limit': limit,
+                'offset': offset,
+                'documents': docs[offset:offset + limit]
             }
     
-    def _list_from_database(self, customer_id: str = None) -> Dict[str, Any]:
-        """List documents from database"""
+    def _list_from_database(self, customer_id: str = None, limit: int = 100, offset: int = 0) -> Dict[str, Any]:
+        """List documents from database (listed columns only, no extracted text)"""
         try:
-            session = get_database_session()
-            query = session.query(Document)
-            
-            if customer_id:
-                query = query.filter(Document.customer_id == customer_id)
-            
-            documents = query.all()
-            session.close()
+            with get_database_session() as session:
+                query = session.query(
+                    Document.id, Document.filename, Document.file_type, Document.customer_id,
+                    Document.text_length, Document.processed, Document.processing_status, Document.upload_time
+                )
+                
+                if customer_id:
+                    query = query.filter(Document.customer_id == customer_id)
+                
+                # Count with the same filter, before paging
+                total = query.order_by(None).count()
+                documents = query.order_by(Document.upload_time.desc(), Document.id).limit(limit).offset(offset).all()
             
             doc_list = []
             for doc in documents:
@@ -347,13 +612,15 @@ class SimpleDocumentIngestionAgent:
                 })
             
             return {
-                'total_documents': len(doc_list),
+                'total_documents': total,
+                'limit': limit,
+                'offset': offset,
                 'documents': doc_list
             }
             
         except Exception as e:
-            logger.error(f"Database list error: {e}")
-            return {'total_documents': 0, 'documents': []}
+            logger.error("Database list error: %s", e)
+            return {'total_documents': 0, 'limit': limit, 'offset': offset, 'documents': []}
 
 
 # Test function
@@ -411,7 +678,7 @@ Additional Information:
     
     print(f"\n📊 PROCESSING RESULT:")
     print(f"   Status: {result['status']}")
-    if result['status'] == 'success':
+    if result['status'] in ('success', 'duplicate'):
         print(f"   Document ID: {result['document_id']}")
         print(f"   Text Length: {result['text_length']} characters")
         print(f"   Customer ID: {result['customer_id']}")
@@ -420,7 +687,7 @@ Additional Information:
         print(f"   Error: {result['error']}")
     
     # Test retrieval
-    if result['status'] == 'success':
+    if result['status'] in ('success', 'duplicate'):
         print(f"\n{'='*50}")
         print("🔍 RETRIEVAL TEST")
         print(f"{'='*50}")
@@ -470,4 +737,5 @@ Additional Information:
     return agent
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
     test_agent()
\ No newline at end of file
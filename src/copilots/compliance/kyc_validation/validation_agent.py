@@ -1,15 +1,32 @@
 # src/copilots/compliance/kyc_validation/validation_agent.py
 import re
-import json
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 from typing import Dict, Any, List
 import logging
 
+# Aho-Corasick finds every keyword of a group in one pass over the text
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+
+# google-re2 matches in linear time (no backtracking on hostile OCR output)
+try:
+    import re2
+    RE2_AVAILABLE = True
+except ImportError:
+    RE2_AVAILABLE = False
+
 # Import handlers
 try:
     from ..shared.kafka_handler import KafkaHandler
     from ..shared.models import KYCValidation, get_database_session, test_database_connection
-    from ..config import Config
+    from ..config import get_config
 except ImportError:
     import sys
     import os
@@ -18,20 +35,152 @@ except ImportError:
     sys.path.insert(0, parent_dir)
     from copilots.compliance.shared.kafka_handler import KafkaHandler
     from copilots.compliance.shared.models import KYCValidation, get_database_session, test_database_connection
-    from copilots.compliance.config import Config
+    from copilots.compliance.config import get_config
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+class _LinearPattern:
+    """Regex run by RE2 on ASCII text when google-re2 is installed, else by re
+    
+    RE2's \\d and \\b are ASCII-only, so other text (e.g. Arabic-Indic digits) keeps re's Unicode rules.
+    """
+    __slots__ = ("_re", "_re2")
+    
+    def __init__(self, pattern: str, re_pattern: str = None):
+        self._re = re.compile(re_pattern or pattern)  # re_pattern: an equivalent form tuned for re
+        self._re2 = re2.compile(pattern) if RE2_AVAILABLE else None
+    
+    def _engine(self, text: str):
+        return self._re2 if self._re2 is not None and text.isascii() else self._re
+    
+    def search(self, text: str):
+        return self._engine(text).search(text)
+    
+    def findall(self, text: str) -> List[str]:
+        return self._engine(text).findall(text)
+
+def _digit_run(length: int, first: str = r'\d') -> _LinearPattern:
+    """Standalone run of exactly `length` digits whose first digit matches `first`
+    
+    For re the pattern starts with the digit class instead of \\b, so the engine skips
+    non-digit text in its C prefix scan; the look-arounds are the two word boundaries.
+    """
+    return _LinearPattern(
+        rf'\b{first}\d{{{length - 1}}}\b',
+        re_pattern=rf'{first}(?<!\w{first})\d{{{length - 1}}}(?!\w)'
+    )
+
+# Validation patterns (compiled once per process)
+_CR_RE = _digit_run(10)
+_SAUDI_ID_RE = _digit_run(10, first='[12]')
+_VAT_RE = _digit_run(15)
+_ARABIC_RE = re.compile(r'[\u0600-\u06FF]')
+# IBANs and plain account numbers in one scan (the two never overlap: an IBAN's digits follow "SA")
+_ACCOUNT_RE = _LinearPattern(r'\bSA\d{22}\b|\b\d{10,20}\b')
+# ISO dates, then day/month/year with - or / (covers the old dd/mm/yyyy pattern)
+_DATE_RE = _LinearPattern(r'\d{4}-\d{2}-\d{2}|\d{1,2}[-/]\d{1,2}[-/]\d{4}')
+
+# Validator keywords (matched against lower-cased text, except the case-sensitive currency markers).
+# Tuples keep the order reported in details; frozensets are only tested for any hit.
+_COMPANY_INDICATORS = frozenset({"company", "corp", "ltd", "llc", "شركة"})
+_SAUDI_INDICATORS = ('saudi', 'السعودية', 'kingdom', 'المملكة', 'riyadh', 'jeddah', 'الرياض')
+_ID_KEYWORDS = ('identity', 'national', 'هوية', 'وطنية', 'card', 'بطاقة')
+_BANK_KEYWORDS = ('bank', 'بنك', 'account', 'حساب', 'statement', 'كشف', 'balance', 'رصيد')
+_CURRENCY_MARKERS = ('SAR', 'SR', 'ريال', 'رس')
+_TAX_KEYWORDS = ('tax', 'ضريبة', 'vat', 'ضريبة القيمة المضافة', 'certificate', 'شهادة')
+_VALIDITY_KEYWORDS = frozenset({'valid', 'issued', 'expiry', 'صالح', 'صادر'})
+
+# Document type keywords; when several types match, the earlier type in _DOC_TYPE_PRIORITY wins
+_DOC_TYPE_PRIORITY = ("commercial_registration", "national_id", "bank_statements", "tax_certificate")
+_FILENAME_TYPE_KEYWORDS = {
+    "commercial": "commercial_registration",
+    "registration": "commercial_registration",
+    "national": "national_id",
+    "id": "national_id",
+    "bank": "bank_statements",
+    "statement": "bank_statements",
+    "tax": "tax_certificate",
+    "vat": "tax_certificate"
+}
+_FILENAME_TYPE_RE = re.compile("(?=(%s))" % "|".join(_FILENAME_TYPE_KEYWORDS))  # Lookahead: overlapping hits
+_CONTENT_TYPE_KEYWORDS = {
+    "commercial registration": "commercial_registration",
+    "تجاري": "commercial_registration",
+    "ministry of commerce": "commercial_registration",
+    "national id": "national_id",
+    "هوية": "national_id",
+    "identity card": "national_id",
+    "bank statement": "bank_statements",
+    "account": "bank_statements",
+    "بنك": "bank_statements",
+    "tax certificate": "tax_certificate",
+    "vat": "tax_certificate",
+    "ضريبة": "tax_certificate"
+}
+_FILENAME_TYPE_RANK = {keyword: _DOC_TYPE_PRIORITY.index(doc_type) for keyword, doc_type in _FILENAME_TYPE_KEYWORDS.items()}
+_CONTENT_TYPE_RANK = {keyword: _DOC_TYPE_PRIORITY.index(doc_type) for keyword, doc_type in _CONTENT_TYPE_KEYWORDS.items()}
+_CONTENT_KEYWORDS_BY_TYPE = tuple(
+    tuple(keyword for keyword, keyword_type in _CONTENT_TYPE_KEYWORDS.items() if keyword_type == doc_type)
+    for doc_type in _DOC_TYPE_PRIORITY
+)
+
+_KEYWORD_GROUPS = {
+    "document_type": tuple(_CONTENT_TYPE_KEYWORDS),
+    "commercial_registration": (*_COMPANY_INDICATORS, *_SAUDI_INDICATORS),
+    "national_id": _ID_KEYWORDS,
+    "bank_statements": _BANK_KEYWORDS,
+    "currency": _CURRENCY_MARKERS,
+    "tax_certificate": (*_TAX_KEYWORDS, *_VALIDITY_KEYWORDS)
+}
+
+def _build_matcher(keywords):
+    """Aho-Corasick automaton over the keywords (None without pyahocorasick)"""
+    if not AHOCORASICK_AVAILABLE:
+        return None
+    automaton = ahocorasick.Automaton()
+    for keyword in keywords:
+        automaton.add_word(keyword, keyword)
+    automaton.make_automaton()
+    return automaton
+
+_KEYWORD_MATCHERS = {group: _build_matcher(keywords) for group, keywords in _KEYWORD_GROUPS.items()}
+
+def _keyword_hits(group: str, text: str) -> set:
+    """Keywords of a group that occur in text (one pass when pyahocorasick is installed)"""
+    automaton = _KEYWORD_MATCHERS[group]
+    if automaton is None:
+        return {keyword for keyword in _KEYWORD_GROUPS[group] if keyword in text}
+    return {keyword for _, keyword in automaton.iter(text)}
+
+def _content_document_type(text_lower: str) -> str:
+    """Highest-priority document type named in the text (stops once no better type can follow)"""
+    automaton = _KEYWORD_MATCHERS["document_type"]
+    if automaton is None:
+        for doc_type, keywords in zip(_DOC_TYPE_PRIORITY, _CONTENT_KEYWORDS_BY_TYPE):
+            if any(keyword in text_lower for keyword in keywords):
+                return doc_type
+        return "unknown"
+    
+    best = len(_DOC_TYPE_PRIORITY)
+    for _, keyword in automaton.iter(text_lower):
+        best = min(best, _CONTENT_TYPE_RANK[keyword])
+        if best == 0:
+            break
+    return _DOC_TYPE_PRIORITY[best] if best < len(_DOC_TYPE_PRIORITY) else "unknown"
+
 class KYCValidationAgent:
     """
     KYC Validation Agent for SAMA Compliance
     Validates documents against Saudi regulatory requirements
     """
     
+    _validation_pool = None  # Shared ProcessPoolExecutor, created on the first large batch
+    _validation_workers = 1  # Worker count the pool was created with
+    
     def __init__(self):
-        self.config = Config()
+        self.config = get_config()
         self.kafka_handler = KafkaHandler()
         
         # Test database connection
@@ -40,6 +189,11 @@ class KYCValidationAgent:
         if not self.use_database:
             print("⚠️  Database not available, validation results will be logged only")
         
+        # Validation rows waiting for one bulk insert (see flush_validations)
+        self._pending: List[KYCValidation] = []
+        self._pending_since = 0.0
+        self._pending_lock = threading.Lock()
+        
         # SAMA compliance requirements for SME KYC
         self.required_documents = [
             "commercial_registration",
@@ -56,35 +210,15 @@ class KYCValidationAgent:
         """
         Main validation function for KYC documents
         """
-        print(f"\n🔍 Starting KYC validation for: {filename}")
-        print(f"   📄 Document ID: {document_id}")
-        print(f"   👤 Customer ID: {customer_id}")
+        result = self._validate(document_id, extracted_text, filename, customer_id)
+        if "error" in result:
+            return result
         
         try:
-            # Determine document type
-            doc_type = self._identify_document_type(filename, extracted_text)
-            print(f"   📝 Detected document type: {doc_type}")
-            
-            # Run validation based on document type
-            validation_result = self._run_validation(doc_type, extracted_text, filename)
-            
-            # Create complete result
-            result = {
-                "document_id": document_id,
-                "customer_id": customer_id,
-                "filename": filename,
-                "document_type": doc_type,
-                "is_valid": validation_result["is_valid"],
-                "validation_score": validation_result["score"],
-                "issues": validation_result["issues"],
-                "recommendations": validation_result["recommendations"],
-                "validated_at": datetime.now().isoformat(),
-                "validation_details": validation_result.get("details", {})
-            }
-            
-            # Store validation result
+            # Store validation result (written through, so the row exists before the event is sent)
             if self.use_database:
                 self._store_validation_result(result)
+                self.flush_validations()
             
             # Emit validation completion event
             self.kafka_handler.send_event(
@@ -99,59 +233,122 @@ class KYCValidationAgent:
             return result
             
         except Exception as e:
-            error_result = {
+            return self._error_result(document_id, filename, customer_id, e)
+    
+    def validate_kyc_documents(self, documents: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Validate several KYC documents, publishing their events in one batch
+        
+        Args:
+            documents: Dicts with document_id, extracted_text, filename and optional customer_id
+            
+        Returns:
+            One result dictionary per document, in input order
+        """
+        args = [
+            (doc["document_id"], doc["extracted_text"], doc["filename"], doc.get("customer_id"))
+            for doc in documents
+        ]
+        if len(args) > self.config.KYC_PARALLEL_THRESHOLD and (os.cpu_count() or 1) > 1:
+            results = self._validate_parallel(args)
+        else:
+            results = [self._validate(*doc_args) for doc_args in args]
+        validated = [result for result in results if "error" not in result]
+        
+        try:
+            if self.use_database:
+                for result in validated:
+                    self._store_validation_result(result)
+                self.flush_validations()
+            
+            self.kafka_handler.send_events_batch(
+                topic="kyc-validation-completed",
+                events=[(result["document_id"], result) for result in validated]
+            )
+            
+            self._print_validation_summary(*validated)
+            
+        except Exception as e:
+            logger.error(f"KYC batch publishing error: {e}")
+        
+        return results
+    
+    def _validate_parallel(self, args: List[tuple]) -> List[Dict[str, Any]]:
+        """Run the validation rules across worker processes, in input order"""
+        cls = type(self)
+        if cls._validation_pool is None:
+            cls._validation_workers = min(os.cpu_count() or 1, self.config.KYC_MAX_WORKERS)
+            cls._validation_pool = ProcessPoolExecutor(max_workers=cls._validation_workers)
+        
+        # A few chunks per worker keeps IPC low while balancing uneven document sizes
+        chunk_size = -(-len(args) // (cls._validation_workers * 4))
+        return list(cls._validation_pool.map(_validate_worker, *zip(*args), chunksize=chunk_size))
+    
+    def _validate(self, document_id: str, extracted_text: str, 
+                  filename: str, customer_id: str = None) -> Dict[str, Any]:
+        """Build the validation result for one document (no storage or events)"""
+        logger.debug("🔍 Starting KYC validation for: %s (document %s, customer %s)", filename, document_id, customer_id)
+        
+        try:
+            # Lower-case once for every keyword check below
+            text_lower = extracted_text.lower()
+            
+            # Determine document type
+            doc_type = self._identify_document_type(filename.lower(), text_lower)
+            logger.debug("📝 Detected document type: %s", doc_type)
+            
+            # Run validation based on document type
+            validation_result = self._run_validation(doc_type, extracted_text, text_lower)
+            
+            # Create complete result
+            return {
                 "document_id": document_id,
                 "customer_id": customer_id,
                 "filename": filename,
-                "is_valid": False,
-                "error": str(e),
-                "validated_at": datetime.now().isoformat()
+                "document_type": doc_type,
+                "is_valid": validation_result["is_valid"],
+                "validation_score": validation_result["score"],
+                "issues": validation_result["issues"],
+                "recommendations": validation_result["recommendations"],
+                "validated_at": datetime.now().isoformat(),
+                "validation_details": validation_result.get("details", {})
             }
             
-            print(f"❌ Validation error: {e}")
-            logger.error(f"KYC validation error for {document_id}: {e}")
-            
-            return error_result
+        except Exception as e:
+            return self._error_result(document_id, filename, customer_id, e)
     
-    def _identify_document_type(self, filename: str, text: str) -> str:
-        """Identify document type from filename and content"""
-        filename_lower = filename.lower()
-        text_lower = text.lower()
-        
-        # Check filename first
-        if "commercial" in filename_lower or "registration" in filename_lower:
-            return "commercial_registration"
-        elif "national" in filename_lower or "id" in filename_lower:
-            return "national_id"
-        elif "bank" in filename_lower or "statement" in filename_lower:
-            return "bank_statements"
-        elif "tax" in filename_lower or "vat" in filename_lower:
-            return "tax_certificate"
-        
-        # Check content
-        if any(keyword in text_lower for keyword in ["commercial registration", "تجاري", "ministry of commerce"]):
-            return "commercial_registration"
-        elif any(keyword in text_lower for keyword in ["national id", "هوية", "identity card"]):
-            return "national_id"
-        elif any(keyword in text_lower for keyword in ["bank statement", "account", "بنك"]):
-            return "bank_statements"
-        elif any(keyword in text_lower for keyword in ["tax certificate", "vat", "ضريبة"]):
-            return "tax_certificate"
-        
-        return "unknown"
+    def _error_result(self, document_id: str, filename: str, customer_id: str, error: Exception) -> Dict[str, Any]:
+        """Result for a document whose validation failed"""
+        logger.error(f"KYC validation error for {document_id}: {error}")
+        return {
+            "document_id": document_id,
+            "customer_id": customer_id,
+            "filename": filename,
+            "is_valid": False,
+            "error": str(error),
+            "validated_at": datetime.now().isoformat()
+        }
     
-    def _run_validation(self, doc_type: str, text: str, filename: str) -> Dict[str, Any]:
-        """Run specific validation based on document type"""
-        print(f"   🔍 Running {doc_type} validation rules...")
+    def _identify_document_type(self, filename_lower: str, text_lower: str) -> str:
+        """Identify document type from lower-cased filename and content"""
+        # Check filename first (one scan); content is scanned only when the filename says nothing
+        ranks = [_FILENAME_TYPE_RANK[keyword] for keyword in _FILENAME_TYPE_RE.findall(filename_lower)]
+        if ranks:
+            return _DOC_TYPE_PRIORITY[min(ranks)]
+        return _content_document_type(text_lower)
+    
+    def _run_validation(self, doc_type: str, text: str, text_lower: str) -> Dict[str, Any]:
+        """Run specific validation based on document type (text for patterns, text_lower for keywords)"""
+        logger.debug("🔍 Running %s validation rules...", doc_type)
         
         if doc_type == "commercial_registration":
-            return self._validate_commercial_registration(text)
+            return self._validate_commercial_registration(text, text_lower)
         elif doc_type == "national_id":
-            return self._validate_national_id(text)
+            return self._validate_national_id(text, text_lower)
         elif doc_type == "bank_statements":
-            return self._validate_bank_statements(text)
+            return self._validate_bank_statements(text, text_lower)
         elif doc_type == "tax_certificate":
-            return self._validate_tax_certificate(text)
+            return self._validate_tax_certificate(text, text_lower)
         else:
             return {
                 "is_valid": False,
@@ -161,63 +358,59 @@ class KYCValidationAgent:
                 "details": {"supported_types": self.required_documents}
             }
     
-    def _validate_commercial_registration(self, text: str) -> Dict[str, Any]:
+    def _validate_commercial_registration(self, text: str, text_lower: str) -> Dict[str, Any]:
         """Validate commercial registration certificate against SAMA requirements"""
         issues = []
         recommendations = []
         details = {}
         score = 0
         
-        print("     📋 Checking commercial registration requirements...")
+        logger.debug("📋 Checking commercial registration requirements...")
+        
+        hits = _keyword_hits("commercial_registration", text_lower)
         
         # Check for CR number (10 digits)
-        cr_pattern = r'\b\d{10}\b'
-        cr_match = re.search(cr_pattern, text)
+        cr_match = _CR_RE.search(text)
         if cr_match:
             score += 25
             details["cr_number"] = cr_match.group()
-            print(f"     ✅ CR Number found: {cr_match.group()}")
+            logger.debug("✅ CR Number found: %s", cr_match.group())
         else:
             issues.append("Commercial Registration number (10 digits) not found")
             recommendations.append("Ensure CR number is clearly visible in the document")
-            print("     ❌ CR Number not found")
+            logger.debug("❌ CR Number not found")
         
         # Check for company name
-        company_indicators = ["company", "corp", "ltd", "llc", "شركة"]
-        if any(indicator in text.lower() for indicator in company_indicators):
+        if not hits.isdisjoint(_COMPANY_INDICATORS):
             score += 25
-            print("     ✅ Company indicators found")
+            logger.debug("✅ Company indicators found")
         else:
             issues.append("Company name or business entity indicators not clear")
             recommendations.append("Ensure company name is clearly visible")
-            print("     ❌ Company indicators not found")
+            logger.debug("❌ Company indicators not found")
         
         # Check for dates (issue/expiry)
-        date_patterns = [r'\d{4}-\d{2}-\d{2}', r'\d{2}/\d{2}/\d{4}', r'\d{1,2}[-/]\d{1,2}[-/]\d{4}']
-        dates_found = []
-        for pattern in date_patterns:
-            dates_found.extend(re.findall(pattern, text))
+        dates_found = _DATE_RE.findall(text)
         
         if dates_found:
             score += 20
             details["dates_found"] = dates_found
-            print(f"     ✅ Dates found: {dates_found}")
+            logger.debug("✅ Dates found: %s", dates_found)
         else:
             issues.append("Issue date or expiry date not clearly identified")
             recommendations.append("Ensure document dates are visible")
-            print("     ❌ No dates found")
+            logger.debug("❌ No dates found")
         
         # Check for Saudi Arabia indicators
-        saudi_indicators = ['saudi', 'السعودية', 'kingdom', 'المملكة', 'riyadh', 'jeddah', 'الرياض']
-        found_indicators = [ind for ind in saudi_indicators if ind in text.lower()]
+        found_indicators = [ind for ind in _SAUDI_INDICATORS if ind in hits]
         if found_indicators:
             score += 30
             details["saudi_indicators"] = found_indicators
-            print(f"     ✅ Saudi indicators found: {found_indicators}")
+            logger.debug("✅ Saudi indicators found: %s", found_indicators)
         else:
             issues.append("Document jurisdiction unclear - should be from Saudi Arabia")
             recommendations.append("Verify document is issued by Saudi authorities")
-            print("     ❌ Saudi indicators not found")
+            logger.debug("❌ Saudi indicators not found")
         
         return {
             "is_valid": score >= 70,
@@ -227,47 +420,45 @@ class KYCValidationAgent:
             "details": details
         }
     
-    def _validate_national_id(self, text: str) -> Dict[str, Any]:
+    def _validate_national_id(self, text: str, text_lower: str) -> Dict[str, Any]:
         """Validate Saudi National ID"""
         issues = []
         recommendations = []
         details = {}
         score = 0
         
-        print("     📋 Checking National ID requirements...")
+        logger.debug("📋 Checking National ID requirements...")
         
         # Check for Saudi ID pattern (10 digits starting with 1 or 2)
-        id_pattern = r'\b[12]\d{9}\b'
-        id_match = re.search(id_pattern, text)
+        id_match = _SAUDI_ID_RE.search(text)
         if id_match:
             score += 40
             details["national_id"] = id_match.group()
-            print(f"     ✅ Valid Saudi National ID found: {id_match.group()}")
+            logger.debug("✅ Valid Saudi National ID found: %s", id_match.group())
         else:
             issues.append("Valid Saudi National ID number (10 digits, starts with 1 or 2) not found")
             recommendations.append("Ensure National ID number is clearly visible")
-            print("     ❌ Valid Saudi National ID not found")
+            logger.debug("❌ Valid Saudi National ID not found")
         
         # Check for Arabic text
-        arabic_pattern = r'[\u0600-\u06FF]+'
-        if re.search(arabic_pattern, text):
+        if _ARABIC_RE.search(text):
             score += 30
-            print("     ✅ Arabic text detected")
+            logger.debug("✅ Arabic text detected")
         else:
             issues.append("Arabic text not detected - may not be official Saudi document")
             recommendations.append("Ensure document contains Arabic text")
-            print("     ❌ Arabic text not found")
+            logger.debug("❌ Arabic text not found")
         
         # Check for identity-related keywords
-        id_keywords = ['identity', 'national', 'هوية', 'وطنية', 'card', 'بطاقة']
-        found_keywords = [kw for kw in id_keywords if kw in text.lower()]
+        hits = _keyword_hits("national_id", text_lower)
+        found_keywords = [kw for kw in _ID_KEYWORDS if kw in hits]
         if found_keywords:
             score += 30
             details["identity_keywords"] = found_keywords
-            print(f"     ✅ Identity keywords found: {found_keywords}")
+            logger.debug("✅ Identity keywords found: %s", found_keywords)
         else:
             issues.append("Identity document keywords not found")
-            print("     ❌ Identity keywords not found")
+            logger.debug("❌ Identity keywords not found")
         
         return {
             "is_valid": score >= 70,
@@ -277,52 +468,50 @@ class KYCValidationAgent:
             "details": details
         }
     
-    def _validate_bank_statements(self, text: str) -> Dict[str, Any]:
+    def _validate_bank_statements(self, text: str, text_lower: str) -> Dict[str, Any]:
         """Validate bank statements"""
         issues = []
         recommendations = []
         details = {}
         score = 0
         
-        print("     📋 Checking bank statement requirements...")
+        logger.debug("📋 Checking bank statement requirements...")
         
         # Check for bank indicators
-        bank_keywords = ['bank', 'بنك', 'account', 'حساب', 'statement', 'كشف', 'balance', 'رصيد']
-        found_keywords = [kw for kw in bank_keywords if kw in text.lower()]
+        hits = _keyword_hits("bank_statements", text_lower)
+        found_keywords = [kw for kw in _BANK_KEYWORDS if kw in hits]
         if found_keywords:
             score += 30
             details["bank_keywords"] = found_keywords
-            print(f"     ✅ Bank keywords found: {found_keywords}")
+            logger.debug("✅ Bank keywords found: %s", found_keywords)
         else:
             issues.append("Bank statement indicators not found")
-            print("     ❌ Bank keywords not found")
+            logger.debug("❌ Bank keywords not found")
         
         # Check for account numbers or IBAN
-        account_patterns = [r'\bSA\d{22}\b', r'\b\d{10,20}\b']
-        accounts_found = []
-        for pattern in account_patterns:
-            accounts_found.extend(re.findall(pattern, text))
+        # IBANs first, as before (stable sort keeps document order within each kind)
+        accounts_found = sorted(_ACCOUNT_RE.findall(text), key=lambda account: not account.startswith('SA'))
         
         if accounts_found:
             score += 35
             details["account_numbers"] = accounts_found[:2]  # Limit for privacy
-            print(f"     ✅ Account numbers found: {len(accounts_found)} accounts")
+            logger.debug("✅ Account numbers found: %d accounts", len(accounts_found))
         else:
             issues.append("Account number or IBAN not found")
             recommendations.append("Ensure account number/IBAN is visible")
-            print("     ❌ Account numbers not found")
+            logger.debug("❌ Account numbers not found")
         
         # Check for Saudi currency
-        currency_patterns = ['SAR', 'SR', 'ريال', 'رس']
-        found_currency = [curr for curr in currency_patterns if curr in text]
+        currency_hits = _keyword_hits("currency", text)
+        found_currency = [curr for curr in _CURRENCY_MARKERS if curr in currency_hits]
         if found_currency:
             score += 35
             details["currency"] = found_currency
-            print(f"     ✅ Saudi currency found: {found_currency}")
+            logger.debug("✅ Saudi currency found: %s", found_currency)
         else:
             issues.append("Saudi currency (SAR) not detected")
             recommendations.append("Ensure statement shows SAR currency")
-            print("     ❌ Saudi currency not found")
+            logger.debug("❌ Saudi currency not found")
         
         return {
             "is_valid": score >= 70,
@@ -332,46 +521,45 @@ class KYCValidationAgent:
             "details": details
         }
     
-    def _validate_tax_certificate(self, text: str) -> Dict[str, Any]:
+    def _validate_tax_certificate(self, text: str, text_lower: str) -> Dict[str, Any]:
         """Validate tax certificate"""
         issues = []
         recommendations = []
         details = {}
         score = 0
         
-        print("     📋 Checking tax certificate requirements...")
+        logger.debug("📋 Checking tax certificate requirements...")
+        
+        hits = _keyword_hits("tax_certificate", text_lower)
         
         # Check for tax keywords
-        tax_keywords = ['tax', 'ضريبة', 'vat', 'ضريبة القيمة المضافة', 'certificate', 'شهادة']
-        found_keywords = [kw for kw in tax_keywords if kw in text.lower()]
+        found_keywords = [kw for kw in _TAX_KEYWORDS if kw in hits]
         if found_keywords:
             score += 40
             details["tax_keywords"] = found_keywords
-            print(f"     ✅ Tax keywords found: {found_keywords}")
+            logger.debug("✅ Tax keywords found: %s", found_keywords)
         else:
             issues.append("Tax certificate indicators not found")
-            print("     ❌ Tax keywords not found")
+            logger.debug("❌ Tax keywords not found")
         
         # Check for VAT number (15 digits)
-        vat_pattern = r'\b\d{15}\b'
-        vat_match = re.search(vat_pattern, text)
+        vat_match = _VAT_RE.search(text)
         if vat_match:
             score += 35
             details["vat_number"] = vat_match.group()
-            print(f"     ✅ VAT number found: {vat_match.group()}")
+            logger.debug("✅ VAT number found: %s", vat_match.group())
         else:
             issues.append("15-digit VAT registration number not found")
             recommendations.append("Ensure VAT number is clearly visible")
-            print("     ❌ VAT number not found")
+            logger.debug("❌ VAT number not found")
         
         # Check for certificate validity
-        validity_keywords = ['valid', 'issued', 'expiry', 'صالح', 'صادر']
-        if any(kw in text.lower() for kw in validity_keywords):
+        if not hits.isdisjoint(_VALIDITY_KEYWORDS):
             score += 25
-            print("     ✅ Validity indicators found")
+            logger.debug("✅ Validity indicators found")
         else:
             issues.append("Certificate validity information unclear")
-            print("     ❌ Validity indicators not found")
+            logger.debug("❌ Validity indicators not found")
         
         return {
             "is_valid": score >= 70,
@@ -382,50 +570,82 @@ class KYCValidationAgent:
         }
     
     def _store_validation_result(self, result: Dict[str, Any]):
-        """Store validation result in database"""
+        """Buffer a validation result; the buffer is bulk-inserted when full or stale (or by flush_validations)"""
+        validation = KYCValidation(
+            document_id=result["document_id"],
+            customer_id=result["customer_id"],
+            document_type=result["document_type"],
+            is_valid=result["is_valid"],
+            validation_score=result["validation_score"],
+            issues=result["issues"],
+            recommendations=result["recommendations"]
+        )
+        
+        with self._pending_lock:
+            if not self._pending:
+                self._pending_since = time.monotonic()
+            self._pending.append(validation)
+            due = (len(self._pending) >= self.config.KYC_VALIDATION_BATCH_SIZE
+                   or time.monotonic() - self._pending_since >= self.config.KYC_VALIDATION_FLUSH_SECONDS)
+        
+        if due:
+            self.flush_validations()
+    
+    def flush_validations(self) -> int:
+        """Write all buffered validation results in one transaction"""
+        with self._pending_lock:
+            pending, self._pending = self._pending, []
+        if not pending:
+            return 0
+        
         try:
-            session = get_database_session()
-            
-            validation = KYCValidation(
-                document_id=result["document_id"],
-                customer_id=result["customer_id"],
-                document_type=result["document_type"],
-                is_valid=result["is_valid"],
-                validation_score=result["validation_score"],
-                issues=json.dumps(result["issues"]),
-                recommendations=json.dumps(result["recommendations"])
-            )
+            # Session from the shared pool; closing returns the connection even if the commit fails
+            with get_database_session() as session:
+                session.bulk_save_objects(pending)
+                session.commit()
             
-            session.add(validation)
-            session.commit()
-            session.close()
-            
-            print("     💾 Validation result stored in database")
+            logger.debug("💾 %d validation result(s) stored in database", len(pending))
+            return len(pending)
             
         except Exception as e:
-            logger.error(f"Database storage error: {e}")
-            print(f"     ❌ Database storage failed: {e}")
+            logger.error(f"Database storage error ({len(pending)} validation results dropped): {e}")
+            return 0
+    
+    def _print_validation_summary(self, *results: Dict[str, Any]):
+        """Log one line per validation as a single record; the full breakdown is built only when DEBUG is enabled"""
+        if not results or not logger.isEnabledFor(logging.INFO):
+            return
+        
+        logger.info("\n".join(
+            f"{'✅' if result['is_valid'] else '❌'} KYC validation: {result['filename']} "
+            f"({result['document_type']}, score {result['validation_score']}/100, {len(result['issues'])} issue(s))"
+            for result in results
+        ))
+        if not logger.isEnabledFor(logging.DEBUG):
+            return
+        
+        lines = []
+        for result in results:
+            lines += [f"📊 VALIDATION SUMMARY: {result['filename']}", "=" * 40]
+            if result['issues']:
+                lines.append(f"❌ Issues Found ({len(result['issues'])}):")
+                lines.extend(f"   {i}. {issue}" for i, issue in enumerate(result['issues'], 1))
+            if result['recommendations']:
+                lines.append(f"💡 Recommendations ({len(result['recommendations'])}):")
+                lines.extend(f"   {i}. {rec}" for i, rec in enumerate(result['recommendations'], 1))
+            lines.append("=" * 40)
+        logger.debug("\n".join(lines))
+
+
+class _RuleValidator(KYCValidationAgent):
+    """Validation rules only, without Kafka or the database (used in worker processes)"""
     
-    def _print_validation_summary(self, result: Dict[str, Any]):
-        """Print a nice summary of validation results"""
-        print(f"\n📊 VALIDATION SUMMARY")
-        print(f"=" * 40)
-        print(f"📄 Document: {result['filename']}")
-        print(f"📝 Type: {result['document_type']}")
-        print(f"✅ Valid: {'YES' if result['is_valid'] else 'NO'}")
-        print(f"📊 Score: {result['validation_score']}/100")
-        
-        if result['issues']:
-            print(f"\n❌ Issues Found ({len(result['issues'])}):")
-            for i, issue in enumerate(result['issues'], 1):
-                print(f"   {i}. {issue}")
-        
-        if result['recommendations']:
-            print(f"\n💡 Recommendations ({len(result['recommendations'])}):")
-            for i, rec in enumerate(result['recommendations'], 1):
-                print(f"   {i}. {rec}")
-        
-        print(f"=" * 40)
+    def __init__(self):
+        self.required_documents = list(_DOC_TYPE_PRIORITY)
+
+def _validate_worker(document_id: str, extracted_text: str, filename: str, customer_id: str = None) -> Dict[str, Any]:
+    """Process-pool entry point: validate one document without side effects"""
+    return _RuleValidator()._validate(document_id, extracted_text, filename, customer_id)
 
 
 # Test function
@@ -1,19 +1,56 @@
 # src/copilots/compliance/shared/kafka_handler.py
+import contextlib
+import dataclasses
+import importlib.util
 import json
-from datetime import datetime
-from typing import Dict, Any
+import threading
+from collections import defaultdict, deque
+from datetime import date, datetime
+from typing import Dict, Any, Iterable, List, Optional, Tuple, Union
 import logging
 
 logger = logging.getLogger(__name__)
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+    # Naive datetimes in this codebase are local time, so they are not tagged as UTC
+    ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+def _json_default(obj: Any) -> Any:
+    """Fallback encoder for payloads the stdlib json module can't handle"""
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        return dataclasses.asdict(obj)
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if hasattr(obj, "tolist"):  # numpy arrays and scalars
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+def serialize_event(value: Any) -> bytes:
+    """Encode an event payload (dict or dataclass) as UTF-8 JSON"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(value, option=ORJSON_OPTIONS)
+    return json.dumps(value, default=_json_default).encode('utf-8')
+
+def format_event(value: Any) -> str:
+    """Pretty-print an event payload for the mock handler's console output"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(value, option=ORJSON_OPTIONS | orjson.OPT_INDENT_2).decode('utf-8')
+    return json.dumps(value, indent=2, default=_json_default)
+
 class MockKafkaHandler:
     """Mock Kafka handler for testing without actual Kafka setup"""
     
+    MAX_EVENTS = 10_000  # Per topic and overall; the oldest events are dropped beyond this
+    
     def __init__(self):
-        self.events = []  # Store events in memory for testing
+        self._reset()
         print("📤 Mock Kafka Handler initialized (events will be stored in memory)")
     
-    def send_event(self, topic: str, key: str, value: Dict[Any, Any]):
+    def send_event(self, topic: str, key: str, value: Union[Dict[Any, Any], Any]):
         """Mock event sending - stores in memory"""
         event = {
             "topic": topic,
@@ -22,20 +59,27 @@ class MockKafkaHandler:
             "timestamp": datetime.now().isoformat()
         }
         self.events.append(event)
+        self._by_topic[topic].append(event)
         logger.info(f"📤 Mock event sent to {topic}: {key}")
         print(f"📤 Event: {topic} -> {key}")
-        print(f"   📋 Data: {json.dumps(value, indent=2)}")
+        if logger.isEnabledFor(logging.DEBUG):  # Pretty-printing every payload is only worth it when debugging
+            logger.debug("📋 Data: %s", format_event(value))
     
     def get_events(self, topic: str = None) -> list:
         """Get stored events (for testing)"""
         if topic:
-            return [e for e in self.events if e["topic"] == topic]
-        return self.events
+            return list(self._by_topic.get(topic, ()))
+        return list(self.events)
     
     def clear_events(self):
         """Clear stored events"""
-        self.events = []
+        self._reset()
         print("🗑️  Cleared all events")
+    
+    def _reset(self):
+        """Start with empty, bounded event stores (overall in send order, and per topic)"""
+        self.events = deque(maxlen=self.MAX_EVENTS)
+        self._by_topic = defaultdict(lambda: deque(maxlen=self.MAX_EVENTS))
 
 try:
     from kafka import KafkaProducer, KafkaConsumer
@@ -44,10 +88,23 @@ except ImportError:
     KAFKA_AVAILABLE = False
     logger.warning("Kafka not installed, using mock handler")
 
+# Producer batching: wait briefly to fill batches and compress them instead of flushing per send
+PRODUCER_BATCH_CONFIG = {
+    "linger_ms": 20,
+    "batch_size": 64 * 1024,
+    "compression_type": "lz4" if importlib.util.find_spec("lz4") else "gzip",
+    "acks": 1
+}
+
 class KafkaHandler:
     """Kafka handler that auto-detects if Kafka is available"""
     
     def __init__(self, bootstrap_servers: str = "localhost:9092", use_mock: bool = None):
+        # Events held by buffered() blocks (None when no block is active)
+        self._buffer: Optional[List[Tuple[str, str, Any]]] = None
+        self._buffer_depth = 0
+        self._buffer_lock = threading.Lock()
+        
         # Auto-detect if we should use mock
         if use_mock is None:
             use_mock = not KAFKA_AVAILABLE
@@ -60,8 +117,9 @@ class KafkaHandler:
             try:
                 self.producer = KafkaProducer(
                     bootstrap_servers=[bootstrap_servers],
-                    value_serializer=lambda v: json.dumps(v).encode('utf-8'),
-                    key_serializer=lambda k: k.encode('utf-8') if k else None
+                    value_serializer=serialize_event,
+                    key_serializer=lambda k: k.encode('utf-8') if k else None,
+                    **PRODUCER_BATCH_CONFIG
                 )
                 self.is_mock = False
                 print("✅ Connected to real Kafka")
@@ -73,19 +131,85 @@ class KafkaHandler:
                 self.handler = MockKafkaHandler()
                 self.is_mock = True
     
-    def send_event(self, topic: str, key: str, value: Dict[Any, Any]):
-        """Send event to Kafka or mock"""
+    def send_event(self, topic: str, key: str, value: Union[Dict[Any, Any], Any], sync: bool = False) -> Optional[Any]:
+        """Send event to Kafka or mock (value may be a dict or a dataclass)
+        
+        Returns the producer's delivery future without waiting on it (None for mock or on failure);
+        sync=True flushes the producer first, for callers that need the event delivered
+        """
+        futures = self.send_events_batch(topic, [(key, value)], sync=sync)
+        return futures[0] if futures else None
+    
+    def send_events_batch(self, topic: str, events: Iterable[Tuple[str, Any]], sync: bool = False) -> List[Any]:
+        """Queue several (key, value) events for one topic (batched by the producer, not flushed)
+        
+        Returns the delivery futures; pass sync=True (or call flush()) where delivery must be confirmed
+        """
+        if not sync:
+            with self._buffer_lock:
+                if self._buffer is not None:
+                    self._buffer.extend((topic, key, value) for key, value in events)
+                    return []
+        
+        futures = []
         if self.is_mock:
-            self.handler.send_event(topic, key, value)
+            for key, value in events:
+                self.handler.send_event(topic, key, value)
         else:
             try:
-                future = self.producer.send(topic, key=key, value=value)
-                self.producer.flush()
-                logger.info(f"📤 Event sent to Kafka topic {topic}: {key}")
-                print(f"📤 Real Kafka event sent: {topic} -> {key}")
+                for key, value in events:
+                    future = self.producer.send(topic, key=key, value=value)
+                    future.add_errback(self._on_send_error, topic, key)  # Delivery failures surface without blocking
+                    futures.append(future)
+                logger.info(f"📤 {len(futures)} event(s) queued for Kafka topic {topic}")
+                print(f"📤 Real Kafka events queued: {topic} ({len(futures)})")
+                if sync:
+                    self.producer.flush()
             except Exception as e:
                 logger.error(f"Failed to send Kafka event: {e}")
                 print(f"❌ Kafka send failed: {e}")
+        return futures
+    
+    @contextlib.contextmanager
+    def buffered(self):
+        """Hold events sent inside the block; on exit publish them as one batch per topic and flush once
+        
+        Blocks may nest (events go out when the outermost exits); sync=True sends bypass the buffer
+        """
+        with self._buffer_lock:
+            self._buffer_depth += 1
+            if self._buffer is None:
+                self._buffer = []
+        try:
+            yield self
+        finally:
+            with self._buffer_lock:
+                self._buffer_depth -= 1
+                events = None
+                if not self._buffer_depth:
+                    events, self._buffer = self._buffer, None
+            if events:
+                by_topic = defaultdict(list)
+                for topic, key, value in events:
+                    by_topic[topic].append((key, value))
+                for topic, topic_events in by_topic.items():
+                    self.send_events_batch(topic, topic_events)
+                self.flush()
+    
+    def _on_send_error(self, topic: str, key: str, error: Exception):
+        """Producer callback for events that could not be delivered"""
+        logger.error(f"Kafka delivery failed for {topic} ({key}): {error}")
+    
+    def flush(self):
+        """Block until all queued events are delivered (no-op for mock)"""
+        if not self.is_mock:
+            self.producer.flush()
+    
+    def close(self, timeout: float = 10):
+        """Flush pending events (waiting up to timeout seconds) and close the producer"""
+        if not self.is_mock:
+            self.producer.flush(timeout=timeout)
+            self.producer.close(timeout=timeout)
     
     def get_events(self, topic: str = None) -> list:
         """Get events (only works with mock)"""
@@ -1,12 +1,17 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean, Float, create_engine
+import functools
+from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean, Float, Index, JSON, create_engine, inspect, text
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.sql import func
 from datetime import datetime
-from ..config import Config
+from ..config import get_config
 
 Base = declarative_base()
 
+# Binary, indexable JSON on PostgreSQL; plain JSON elsewhere (e.g. SQLite in tests)
+JSONDocument = JSON().with_variant(JSONB(), "postgresql")
+
 class Document(Base):
     __tablename__ = "documents"
     
@@ -20,19 +25,24 @@ class Document(Base):
     text_length = Column(Integer)
     processing_status = Column(String(50), default="pending")
     error_message = Column(Text)
+    
+    __table_args__ = (
+        # Serves per-customer listings, newest first
+        Index("ix_documents_customer_id_upload_time", customer_id, upload_time.desc()),
+    )
 
 class KYCValidation(Base):
     __tablename__ = "kyc_validations"
     
     id = Column(Integer, primary_key=True, autoincrement=True)
-    document_id = Column(String(100), nullable=False)
-    customer_id = Column(String(100))
+    document_id = Column(String(100), nullable=False, index=True)
+    customer_id = Column(String(100), index=True)
     document_type = Column(String(100))
     is_valid = Column(Boolean, default=False)
     validation_score = Column(Float, default=0.0)
     validated_at = Column(DateTime, default=func.now())
-    issues = Column(Text)  # JSON string of issues
-    recommendations = Column(Text)  # JSON string of recommendations
+    issues = Column(JSONDocument)  # List of issue strings
+    recommendations = Column(JSONDocument)  # List of recommendation strings
 
 class AuditLog(Base):
     __tablename__ = "audit_logs"
@@ -48,29 +58,65 @@ class AuditLog(Base):
     session_id = Column(String(100))
 
 # Database connection setup
+@functools.cache
 def get_database_engine():
-    """Create database engine"""
-    return create_engine(Config.POSTGRES_URL)
+    """Get the process-wide database engine (pooled connections, checked before use)"""
+    config = get_config()
+    return create_engine(
+        config.POSTGRES_URL,
+        pool_size=config.DB_POOL_SIZE,
+        pool_pre_ping=True,
+        pool_recycle=config.DB_POOL_RECYCLE
+    )
+
+@functools.cache
+def _get_session_factory():
+    """Session factory bound to the shared engine"""
+    return sessionmaker(autocommit=False, autoflush=False, bind=get_database_engine())
 
 def get_database_session():
-    """Get database session"""
-    engine = get_database_engine()
-    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-    return SessionLocal()
+    """Get database session (connections come from the shared pool)"""
+    return _get_session_factory()()
+
+# Columns that older versions created as Text (json.dumps strings) and now hold JSON lists
+_JSON_COLUMNS = (("kyc_validations", "issues"), ("kyc_validations", "recommendations"))
 
 def create_tables():
-    """Create all tables"""
+    """Create all tables, and upgrade tables created by older versions"""
     engine = get_database_engine()
     Base.metadata.create_all(bind=engine)
+    _upgrade_existing_tables(engine)
     print("✅ Database tables created successfully!")
 
+def _upgrade_existing_tables(engine):
+    """Bring existing tables up to the current schema (a no-op once applied)"""
+    # create_all() leaves existing tables alone, so add indexes introduced since they were created
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+    
+    if engine.dialect.name != "postgresql":
+        return
+    
+    inspector = inspect(engine)
+    with engine.begin() as connection:
+        for table_name, column_name in _JSON_COLUMNS:
+            column_type = next(column["type"] for column in inspector.get_columns(table_name)
+                               if column["name"] == column_name)
+            if isinstance(column_type, String):  # Text included
+                connection.execute(text(
+                    f"ALTER TABLE {table_name} ALTER COLUMN {column_name} TYPE jsonb "
+                    f"USING NULLIF({column_name}, '')::jsonb"
+                ))
+                print(f"🔧 Converted {table_name}.{column_name} to JSONB")
+
 # Test database connection
+@functools.cache
 def test_database_connection():
-    """Test if we can connect to the database"""
+    """Test if we can connect to the database (probed once per process; cache_clear() to re-probe)"""
     try:
-        engine = get_database_engine()
-        connection = engine.connect()
-        connection.close()
+        with get_database_engine().connect():  # Warms the shared pool with one connection
+            pass
         print("✅ Database connection successful!")
         return True
     except Exception as e:
@@ -0,0 +1,291 @@
+# test_batch_and_dedup.py - Deduplication and batch API tests
+"""
+Test re-upload deduplication and the batch entry points:
+1. Document agents skip content already ingested for the same customer
+2. Batch APIs return one result per input, in input order
+3. KYC validation results are buffered in batches and written through for single documents
+"""
+
+import dataclasses
+import sys
+import uuid
+
+# Add src to path
+sys.path.insert(0, 'src')
+
+from copilots.compliance.compliance_summary.summary_agent import ComplianceSummaryAgent
+from copilots.compliance.document_ingestion.agno_agent import AgnoDocumentIngestionAgent
+from copilots.compliance.document_ingestion.simple_agent import SimpleDocumentIngestionAgent
+from copilots.compliance.kyc_validation import validation_agent
+from copilots.compliance.kyc_validation.validation_agent import KYCValidationAgent
+from copilots.compliance.shared.models import KYCValidation
+
+NATIONAL_ID_TEXT = """
+KINGDOM OF SAUDI ARABIA
+NATIONAL IDENTITY CARD
+ID Number: 1234567890
+Name: Ahmed Al-Rashid
+Date of Birth: 1985-03-15
+"""
+
+BANK_STATEMENT_TEXT = """
+AL RAJHI BANK
+BANK STATEMENT
+Account Number: 123456789012
+Opening Balance: 125,000.00 SAR
+Closing Balance: 170,000.00 SAR
+"""
+
+def _write_document(directory, filename, text):
+    """Write a text document with a unique marker, so earlier runs never make it a duplicate"""
+    file_path = directory / filename
+    file_path.write_text(f"{text}\nReference: {uuid.uuid4()}\n", encoding='utf-8')
+    return str(file_path)
+
+def _events(agent, topic):
+    """Events the agent's mock Kafka handler recorded for a topic"""
+    return agent.kafka_handler.handler.get_events(topic)
+
+def test_agno_agent_deduplicates_reupload(tmp_path):
+    """A re-upload by the same customer short-circuits and emits document-deduplicated"""
+    agent = AgnoDocumentIngestionAgent()
+    try:
+        file_path = _write_document(tmp_path, "national_id.txt", NATIONAL_ID_TEXT)
+        
+        first = agent.process_document_enhanced(file_path, "CUST001")
+        second = agent.process_document_enhanced(file_path, "CUST001")
+        
+        assert first["status"] == "success" and not first.get("deduplicated")
+        assert second["deduplicated"] is True
+        assert second["document_id"] == first["document_id"]
+        assert second["extracted_text"] == first["extracted_text"]
+        
+        doc_id = first["document_id"]
+        processed = [e for e in _events(agent, "document-processed-enhanced") if e["key"] == doc_id]
+        deduplicated = [e for e in _events(agent, "document-deduplicated") if e["key"] == doc_id]
+        assert len(processed) == 1
+        assert len(deduplicated) == 1
+        assert deduplicated[0]["value"]["original_processed_at"] == first["processed_at"]
+    finally:
+        agent.close()
+
+def test_agno_agent_dedup_miss_for_other_customer(tmp_path):
+    """The same content uploaded by another customer is a new document"""
+    agent = AgnoDocumentIngestionAgent()
+    try:
+        file_path = _write_document(tmp_path, "bank_statement.txt", BANK_STATEMENT_TEXT)
+        
+        first = agent.process_document_enhanced(file_path, "CUST001")
+        other = agent.process_document_enhanced(file_path, "CUST002")
+        
+        assert not other.get("deduplicated")
+        assert other["document_id"] != first["document_id"]
+        assert not [e for e in _events(agent, "document-deduplicated")
+                    if e["key"] in (first["document_id"], other["document_id"])]
+    finally:
+        agent.close()
+
+def test_agno_agent_dedup_disabled(tmp_path):
+    """With DEDUPLICATE_DOCUMENTS off, every upload runs the full pipeline"""
+    agent = AgnoDocumentIngestionAgent()
+    agent.config = dataclasses.replace(agent.config, DEDUPLICATE_DOCUMENTS=False)
+    try:
+        file_path = _write_document(tmp_path, "national_id.txt", NATIONAL_ID_TEXT)
+        
+        first = agent.process_document_enhanced(file_path, "CUST001")
+        second = agent.process_document_enhanced(file_path, "CUST001")
+        
+        assert first["status"] == second["status"] == "success"
+        assert not second.get("deduplicated")
+        assert second["document_id"] == first["document_id"]
+        
+        doc_id = first["document_id"]
+        assert len([e for e in _events(agent, "document-processed-enhanced") if e["key"] == doc_id]) == 2
+        assert not [e for e in _events(agent, "document-deduplicated") if e["key"] == doc_id]
+    finally:
+        agent.close()
+
+class _StubEmbedder:
+    """Batch embedder that records every request"""
+    
+    def __init__(self):
+        self.requests = []
+    
+    def get_embeddings(self, chunks):
+        self.requests.append(list(chunks))
+        return [[float(len(chunk)), 0.5] for chunk in chunks]
+    
+    def get_embedding(self, chunk):
+        raise AssertionError("chunks should be embedded in one batch")
+
+class _StubKnowledge:
+    """Knowledge base that records upserted chunk records"""
+    
+    def __init__(self):
+        self.embedder = _StubEmbedder()
+        self.records = []
+    
+    def upsert(self, records):
+        self.records.extend(records)
+
+def _agent_with_knowledge(tmp_path):
+    """Agno agent storing chunks in a stub knowledge base, with its embedding cache under tmp_path"""
+    agent = AgnoDocumentIngestionAgent()
+    agent.config = dataclasses.replace(agent.config, DEDUPLICATE_DOCUMENTS=False,
+                                       CHROMA_DB_PATH=str(tmp_path / "chroma_db"))
+    agent.agno_enabled = True
+    agent.knowledge = _StubKnowledge()
+    return agent
+
+def test_agno_agent_embedding_cache(tmp_path):
+    """Chunk embeddings are requested in one batch on a miss, then served from the on-disk cache"""
+    file_path = _write_document(tmp_path, "bank_statement.txt", BANK_STATEMENT_TEXT * 20)
+    
+    agent = _agent_with_knowledge(tmp_path)
+    try:
+        agent.process_document_enhanced(file_path, "CUST001")
+        embedder, records = agent.knowledge.embedder, list(agent.knowledge.records)
+        
+        # Miss: every distinct chunk in a single request
+        assert len(records) > 1
+        assert len(embedder.requests) == 1
+        assert sorted(embedder.requests[0]) == sorted({record["text"] for record in records})
+        assert all(record["embedding"] == [float(len(record["text"])), 0.5] for record in records)
+        
+        # Hit: reprocessing the same content embeds nothing
+        agent.process_document_enhanced(file_path, "CUST001")
+        assert len(embedder.requests) == 1
+        assert [r["embedding"] for r in agent.knowledge.records[len(records):]] == \
+            [r["embedding"] for r in records]
+    finally:
+        agent.close()
+    
+    # Persisted: a new agent reads the vectors back from disk
+    agent = _agent_with_knowledge(tmp_path)
+    try:
+        agent.process_document_enhanced(file_path, "CUST002")
+        assert agent.knowledge.embedder.requests == []
+        assert [r["embedding"] for r in agent.knowledge.records] == [r["embedding"] for r in records]
+    finally:
+        agent.close()
+
+def test_simple_agent_batch_order_and_duplicates(tmp_path):
+    """process_documents keeps input order; repeats and re-uploads come back as duplicates"""
+    agent = SimpleDocumentIngestionAgent()
+    national_id = _write_document(tmp_path, "national_id.txt", NATIONAL_ID_TEXT)
+    bank_statement = _write_document(tmp_path, "bank_statement.txt", BANK_STATEMENT_TEXT)
+    missing = str(tmp_path / "missing.txt")
+    
+    results = agent.process_documents([national_id, missing, bank_statement, national_id], "CUST001")
+    
+    assert [r["status"] for r in results] == ["success", "error", "success", "duplicate"]
+    assert [results[i]["filename"] for i in (0, 2, 3)] == [
+        "national_id.txt", "bank_statement.txt", "national_id.txt"
+    ]
+    assert "missing.txt" in results[1]["error"]
+    assert results[3]["document_id"] == results[0]["document_id"]
+    assert results[3]["document_type"] == results[0]["document_type"] == "national_id"
+    
+    # Re-upload in a later request: duplicate for the same customer, new document for another
+    assert agent.process_document(bank_statement, "CUST001")["status"] == "duplicate"
+    other = agent.process_document(bank_statement, "CUST002")
+    assert other["status"] == "success"
+    assert other["document_id"] != results[2]["document_id"]
+
+def test_validate_kyc_documents_order():
+    """validate_kyc_documents returns results in input order and publishes only the valid ones"""
+    agent = KYCValidationAgent()
+    agent.use_database = False
+    published_before = len(_events(agent, "kyc-validation-completed"))
+    
+    documents = [
+        {"document_id": "DOC-BANK", "extracted_text": BANK_STATEMENT_TEXT,
+         "filename": "bank_statement.txt", "customer_id": "CUST001"},
+        {"document_id": "DOC-BROKEN", "extracted_text": None,
+         "filename": "broken.txt", "customer_id": "CUST001"},
+        {"document_id": "DOC-ID", "extracted_text": NATIONAL_ID_TEXT,
+         "filename": "national_id.txt", "customer_id": "CUST001"},
+    ]
+    results = agent.validate_kyc_documents(documents)
+    
+    assert [r["document_id"] for r in results] == ["DOC-BANK", "DOC-BROKEN", "DOC-ID"]
+    assert results[0]["document_type"] == "bank_statements"
+    assert "error" in results[1]
+    assert results[2]["document_type"] == "national_id"
+    
+    published = _events(agent, "kyc-validation-completed")[published_before:]
+    assert [e["key"] for e in published] == ["DOC-BANK", "DOC-ID"]
+
+def _sqlite_sessions(monkeypatch, tmp_path):
+    """Point the validation agent's database sessions at a fresh SQLite file"""
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    
+    engine = create_engine(f"sqlite:///{tmp_path / 'kyc.db'}")
+    KYCValidation.metadata.create_all(engine)
+    sessions = sessionmaker(bind=engine)
+    monkeypatch.setattr(validation_agent, "get_database_session", sessions)
+    return sessions
+
+def _stored_validations(sessions):
+    with sessions() as session:
+        return session.query(KYCValidation).count()
+
+def test_single_validation_is_written_through(monkeypatch, tmp_path):
+    """A lone validate_kyc_document call stores its row before returning"""
+    sessions = _sqlite_sessions(monkeypatch, tmp_path)
+    agent = KYCValidationAgent()
+    agent.use_database = True
+    
+    result = agent.validate_kyc_document("DOC-ID", NATIONAL_ID_TEXT, "national_id.txt", "CUST001")
+    
+    assert "error" not in result
+    assert _stored_validations(sessions) == 1
+    assert agent.flush_validations() == 0
+
+def test_validation_results_are_buffered(monkeypatch, tmp_path):
+    """Buffered results are written together by flush_validations"""
+    sessions = _sqlite_sessions(monkeypatch, tmp_path)
+    agent = KYCValidationAgent()
+    agent.use_database = True
+    
+    for document_id in ("DOC-1", "DOC-2"):
+        agent._store_validation_result(
+            agent._validate(document_id, NATIONAL_ID_TEXT, "national_id.txt", "CUST001")
+        )
+    assert _stored_validations(sessions) == 0
+    
+    assert agent.flush_validations() == 2
+    assert _stored_validations(sessions) == 2
+    
+    # A batch call flushes its own results
+    agent.validate_kyc_documents([
+        {"document_id": "DOC-3", "extracted_text": BANK_STATEMENT_TEXT,
+         "filename": "bank_statement.txt", "customer_id": "CUST001"}
+    ])
+    assert _stored_validations(sessions) == 3
+
+def test_generate_compliance_summaries_order():
+    """generate_compliance_summaries keeps batch order; empty customers are stored but not announced"""
+    agent = ComplianceSummaryAgent()
+    agent.use_database = False
+    validation = {
+        "document_id": "DOC-ID", "filename": "national_id.txt", "document_type": "national_id",
+        "is_valid": True, "validation_score": 90, "issues": []
+    }
+    
+    summaries = agent.generate_compliance_summaries([
+        ("CUST-A", [validation]),
+        ("CUST-EMPTY", []),
+        ("CUST-B", [validation, {**validation, "document_type": "bank_statements"}]),
+    ])
+    
+    assert [s.customer_id for s in summaries] == ["CUST-A", "CUST-EMPTY", "CUST-B"]
+    assert summaries[1].compliance_status == "NON_COMPLIANT"
+    assert [s.document_analysis.total_documents for s in summaries] == [1, 0, 2]
+    for summary in summaries:
+        assert agent.get_summary(summary.customer_id) is summary
+    
+    published = [e["key"] for e in _events(agent, "compliance-summary-generated")]
+    assert published[-2:] == ["CUST-A", "CUST-B"]
+    assert "CUST-EMPTY" not in published